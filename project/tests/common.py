@@ -0,0 +1,279 @@
+"""
+Shared helpers for the MODMeta test scripts.
+
+Each test script adds the repository root to sys.path before importing this
+module as project.tests.common.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Block size for comparing files byte for byte (filecmp's default is 8 KiB)
+COMPARE_BUFFER_SIZE = 1024 * 1024
+# Smallest file worth a read-ahead hint before comparing; smaller files are
+# read in one block anyway, so the hint would only add syscalls
+PREFETCH_MIN_SIZE = COMPARE_BUFFER_SIZE
+# Hash reported for files that fail verification; it only identifies content,
+# so the faster BLAKE2b is used rather than SHA-256
+HASH_ALGORITHM = "blake2b"
+# Default number of threads comparing files during verification
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+# Failed and missing files kept in memory by verify_files
+FAILED_SAMPLE_LIMIT = 100
+
+# Optional fast JSON encoder for the results files
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def iter_files(root_dir: str):
+    """
+    Yield (os.DirEntry, path relative to root_dir) for every file below root_dir.
+    
+    Walks iteratively with os.scandir, so entry types come from the directory
+    listing and deep trees can't exhaust the recursion limit. Matches os.walk:
+    symlinks to files are included, symlinked directories aren't entered, and
+    missing or unreadable directories are skipped.
+    """
+    prefix_len = len(os.path.join(root_dir, ""))
+    stack = [root_dir]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif not entry.is_dir():
+                    yield entry, entry.path[prefix_len:]
+
+def same_contents(path1: str, path2: str, bufsize: int = COMPARE_BUFFER_SIZE) -> bool:
+    """
+    Return whether two files have identical contents.
+    
+    Like filecmp.cmp(shallow=False), but reads in bufsize blocks, keeps no
+    module-level cache of results, and fails files of different sizes without
+    reading them. For files of at least PREFETCH_MIN_SIZE, the kernel is asked
+    to start reading both up front so the two reads overlap.
+    
+    Raises:
+        OSError: If either file can't be stat'ed or read
+    """
+    size = os.stat(path1).st_size
+    if size != os.stat(path2).st_size:
+        return False
+    with open(path1, "rb", buffering=0) as f1, open(path2, "rb", buffering=0) as f2:
+        if size >= PREFETCH_MIN_SIZE and hasattr(os, "posix_fadvise"):
+            try:
+                for f in (f1, f2):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            except OSError:
+                pass
+        while True:
+            block = f1.read(bufsize)
+            if block != f2.read(bufsize):
+                return False
+            if not block:
+                return True
+
+def hash_file(file_path: str) -> Optional[str]:
+    """
+    Calculate the HASH_ALGORITHM hex digest of a file, or None if it can't be read.
+    
+    Uses hashlib.file_digest (Python 3.11+) on an unbuffered file so reads go
+    straight into its buffer in C; older interpreters read COMPARE_BUFFER_SIZE
+    blocks.
+    """
+    try:
+        with open(file_path, "rb", buffering=0) as f:
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, HASH_ALGORITHM).hexdigest()
+            
+            file_hash = hashlib.new(HASH_ALGORITHM)
+            for block in iter(lambda: f.read(COMPARE_BUFFER_SIZE), b""):
+                file_hash.update(block)
+            return file_hash.hexdigest()
+    except Exception as e:
+        logger.error(f"Error calculating hash for {file_path}: {e}")
+        return None
+
+def _compare_pair(paths: Tuple[str, str]) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Compare an (original, reconstructed) path pair; runs in a worker thread.
+    
+    Hashes are only computed for failed pairs, to report them.
+    
+    Returns:
+        Tuple of (status, original hash, reconstructed hash), where status is
+        "verified" or "failed"
+    """
+    orig_path, recon_path = paths
+    try:
+        if same_contents(orig_path, recon_path):
+            return "verified", None, None
+    except OSError as e:
+        logger.error(f"Error comparing {orig_path} with {recon_path}: {e}")
+    return "failed", hash_file(orig_path), hash_file(recon_path)
+
+def verify_files(source_dir: str, reconstructed_dir: str,
+                 hash_workers: int = HASH_WORKERS,
+                 details_file: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Verify reconstructed files match the originals.
+    
+    Each original file is expected in reconstructed_dir under its base name.
+    Every file result is a dict with original_path, reconstructed_path and
+    status ("verified", "failed" or "missing"); failed results also carry
+    original_hash and reconstructed_hash.
+    
+    Args:
+        source_dir: Original source directory
+        reconstructed_dir: Directory with reconstructed files
+        hash_workers: Number of threads comparing file pairs concurrently
+        details_file: Optional JSON lines file to stream every file's result to
+        
+    Returns:
+        Dictionary with verification results. file_details lists the first
+        FAILED_SAMPLE_LIMIT failed and missing files; file_details_truncated
+        is True when more were left out. Use iter_failed_files to read all
+        failures.
+    """
+    logger.info(f"Verifying reconstructed files against originals in {source_dir}")
+    results = {
+        "total_files": 0,
+        "verified_files": 0,
+        "failed_files": 0,
+        "missing_files": 0,
+        "file_details": [],
+        "file_details_truncated": False
+    }
+    if details_file:
+        results["details_file"] = details_file
+    
+    # List the flat reconstruction directory once instead of checking each file
+    try:
+        reconstructed_names = set(os.listdir(reconstructed_dir))
+    except OSError:
+        reconstructed_names = set()
+    
+    # Pair each original file with its reconstruction
+    join = os.path.join
+    pairs = [(entry.path, join(reconstructed_dir, entry.name), entry.name in reconstructed_names)
+             for entry, _ in iter_files(source_dir)]
+    present = [(orig_path, recon_path) for orig_path, recon_path, exists in pairs if exists]
+    
+    results["total_files"] = len(pairs)
+    
+    # Compare the pairs whose reconstruction exists on worker threads (file
+    # reads release the GIL), streaming results to details_file when given
+    with contextlib.ExitStack() as stack:
+        details_fh = stack.enter_context(open(details_file, 'wb')) if details_file else None
+        executor = stack.enter_context(ThreadPoolExecutor(max_workers=max(1, hash_workers))) if present else None
+        comparisons = executor.map(_compare_pair, present) if executor else iter(())
+        
+        for orig_path, recon_path, exists in pairs:
+            file_result = {
+                "original_path": orig_path,
+                "reconstructed_path": recon_path,
+                "status": "missing"
+            }
+            if exists:
+                status, orig_hash, recon_hash = next(comparisons)
+                file_result["status"] = status
+                if status == "failed":
+                    file_result["original_hash"] = orig_hash
+                    file_result["reconstructed_hash"] = recon_hash
+            results[f"{file_result['status']}_files"] += 1
+            
+            if details_fh is not None:
+                details_fh.write(json_line(file_result))
+            if file_result["status"] != "verified":
+                if len(results["file_details"]) < FAILED_SAMPLE_LIMIT:
+                    results["file_details"].append(file_result)
+                else:
+                    results["file_details_truncated"] = True
+    
+    logger.info(f"File verification: {results['verified_files']} verified, "
+                f"{results['failed_files']} failed, {results['missing_files']} missing")
+    return results
+
+def iter_failed_files(file_results: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every failed file's result from verify_files results, reading them
+    lazily from the details file when one was written.
+    """
+    details_file = file_results.get('details_file')
+    if details_file:
+        with open(details_file, 'rb') as f:
+            for line in f:
+                fields = json_loads(line)
+                if fields.get('status') == 'failed':
+                    yield fields
+    else:
+        for fd in file_results.get('file_details', []):
+            if fd.get('status') == 'failed':
+                yield fd
+
+def json_default(obj: Any) -> Any:
+    """Serialize values json can't handle: digests as hex, dataclasses as dicts, anything else as str."""
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.hex()
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    return str(obj)
+
+def write_json(path: str, data: Any) -> None:
+    """
+    Write data to path as indented JSON, using orjson when it is installed.
+
+    orjson serializes dataclasses natively; json falls back to json_default
+    for them.
+    """
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, default=json_default,
+                                 option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, default=json_default)
+
+def json_line(obj: Any) -> bytes:
+    """Encode obj as one line of JSON (UTF-8, newline terminated)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, default=json_default) + "\n").encode('utf-8')
+
+def json_loads(data: bytes) -> Any:
+    """Decode JSON bytes, such as one line written by json_line."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def read_only_uri(db_path: str) -> str:
+    """
+    Build a SQLite URI that opens a database read-only.
+    
+    Without a pending write-ahead log the file is also opened as immutable,
+    skipping locking and change detection entirely. With one, SQLite has to
+    read the log, so the database is opened normally in read-only mode.
+    """
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    if not os.path.exists(db_path + "-wal"):
+        uri += "&immutable=1"
+    return uri
+
+@lru_cache(maxsize=None)
+def quote_ident(identifier: str) -> str:
+    """Quote an SQLite identifier, escaping embedded double quotes."""
+    return '"' + identifier.replace('"', '""') + '"'
@@ -10,13 +10,16 @@ the API and CLI test frameworks and generates detailed comparison reports.
 import os
 import sys
 import time
-import json
 import logging
 import argparse
+import atexit
+import contextlib
 import hashlib
+import mmap
 import shutil
 import difflib
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
@@ -43,12 +46,49 @@ except ImportError as e:
     logger.error(f"Failed to import test frameworks: {e}")
     sys.exit(1)
 
+from project.tests.common import iter_files, quote_ident, read_only_uri, write_json
+
 # Default test directory - update as needed
 DEFAULT_TEST_DIR = os.path.join(root_dir, "tests", "test_data")
 # Output directory for test results
 OUTPUT_DIR = os.path.join(project_dir, "test_results", "comparison")
 # Detailed report file
 DETAILED_REPORT = os.path.join(OUTPUT_DIR, "API_CLI_COMPARISON_REPORT.md")
+# Number of threads used to hash reconstructed files
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Tables counted per UNION ALL statement (SQLite caps compound SELECTs at 500 terms)
+COUNT_BATCH_SIZE = 200
+# Tuning for the read-only comparison connection; cache and mmap sizes are per database
+READ_ONLY_PRAGMAS = """
+PRAGMA query_only = 1;
+PRAGMA temp_store = MEMORY;
+PRAGMA main.cache_size = -65536;
+PRAGMA cli.cache_size = -65536;
+PRAGMA main.mmap_size = 268435456;
+PRAGMA cli.mmap_size = 268435456;
+"""
+# Columns of the file_details table produced by compare_file_reconstructions
+FILE_DETAIL_COLUMNS = ("filename", "api_size", "cli_size", "api_hash", "cli_hash", "identical", "error")
+# Result sections that may carry an "errors" list or an "error" message
+REPORT_ERROR_SECTIONS = (
+    "comparison_class_results",
+    "scan_comparison",
+    "database_comparison",
+    "file_comparison",
+    "performance_comparison",
+)
+# The interface compared against each one
+_OTHER_INTERFACE = {"API": "CLI", "CLI": "API"}
+# Recommendations added to the findings when one interface is notably worse
+_RECOMMENDATION_TEMPLATES = {
+    "storage": "Investigate {larger} database storage efficiency; consider adopting {other} storage optimizations",
+    "performance": "Optimize {slower} performance; investigate bottlenecks compared to {faster} implementation",
+}
+
+# Reusable read-only database connections: path -> (stat key, connection), where
+# the key is the database's (size, mtime_ns) plus its write-ahead log's, or None
+_db_connections: Dict[str, Tuple[tuple, sqlite3.Connection]] = {}
+
 # Import test scripts to reuse functions
 try:
     sys.path.append(os.path.join(project_dir, "tests"))
@@ -72,6 +112,162 @@ except ImportError as e:
         logger.warning("Using fallback CLI command test")
         return {"success": False, "error": "Failed to import test_cli_command_syntax function"}
 
+def _new_file_hash():
+    """
+    Create the hash object used to compare reconstructed files.
+    
+    Files are only checked for identical content, not protected against tampering,
+    so a 128-bit BLAKE2b digest is used rather than SHA-256, flagged as not used
+    for security so FIPS-restricted builds don't block or slow it down.
+    """
+    return hashlib.blake2b(digest_size=16, usedforsecurity=False)
+
+def _hash_file(file_path: str) -> bytes:
+    """
+    Calculate the raw content digest of a file.
+    
+    Uses hashlib.file_digest (Python 3.11+) so reading and hashing stay in C;
+    older interpreters map the file and hash it as a single buffer.
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, _new_file_hash).digest()
+        
+        file_hash = _new_file_hash()
+        size = os.fstat(f.fileno()).st_size
+        if 0 < size < (1 << 31):
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                file_hash.update(mm)
+        else:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                file_hash.update(chunk)
+        return file_hash.digest()
+
+def _compare_file_pair(filename: str, api_path: str, cli_path: str) -> Tuple:
+    """
+    Hash one API/CLI file pair and return its file_details row.
+    
+    The row holds one value per FILE_DETAIL_COLUMNS entry; values that don't
+    apply (hashes of size-mismatched files, everything after an error) are None.
+    Hashes are raw digest bytes and are only hex-encoded when reported.
+    """
+    try:
+        api_stat = os.stat(api_path)
+        cli_stat = os.stat(cli_path)
+        
+        # Files of different sizes can't be identical, so skip hashing them
+        if api_stat.st_size != cli_stat.st_size:
+            return (filename, api_stat.st_size, cli_stat.st_size, None, None, False, None)
+        
+        api_hash = _hash_file(api_path)
+        cli_hash = _hash_file(cli_path)
+        
+        return (filename, api_stat.st_size, cli_stat.st_size, api_hash, cli_hash,
+                api_hash == cli_hash, None)
+        
+    except Exception as e:
+        logger.error(f"Error comparing file {filename}: {e}")
+        return (filename, None, None, None, None, None, str(e))
+
+def _file_size(path: str) -> int:
+    """Return the size of a file in bytes, or 0 if it can't be stat'ed."""
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+def _read_only_connection(db_path: str) -> sqlite3.Connection:
+    """
+    Return a cached read-only connection to a database, reopening it if the
+    file or its write-ahead log has changed since the connection was made.
+    
+    Args:
+        db_path: Path to the SQLite database
+        
+    Returns:
+        Open sqlite3 connection
+    """
+    st = os.stat(db_path)
+    try:
+        wal_st = os.stat(db_path + "-wal")
+        wal_key = (wal_st.st_size, wal_st.st_mtime_ns)
+    except FileNotFoundError:
+        wal_key = None
+    key = (st.st_size, st.st_mtime_ns, wal_key)
+    cached = _db_connections.get(db_path)
+    if cached is not None:
+        if cached[0] == key:
+            return cached[1]
+        # Without a write-ahead log the database is opened as immutable, so a
+        # changed file, or a log appearing or going away, needs a fresh connection
+        cached[1].close()
+    
+    conn = sqlite3.connect(read_only_uri(db_path), uri=True,
+                           isolation_level=None, check_same_thread=False)
+    _db_connections[db_path] = (key, conn)
+    return conn
+
+def _close_db_connections() -> None:
+    """Close all cached read-only database connections."""
+    for _, conn in _db_connections.values():
+        conn.close()
+    _db_connections.clear()
+
+atexit.register(_close_db_connections)
+
+@contextlib.contextmanager
+def _attached(conn: sqlite3.Connection, db_path: str, alias: str):
+    """
+    Attach a database read-only to a connection for the duration of the block.
+    
+    Args:
+        conn: Connection to attach the database to
+        db_path: Path to the SQLite database
+        alias: Schema name to attach it as
+    """
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (read_only_uri(db_path),))
+    try:
+        yield
+    finally:
+        conn.execute(f"DETACH DATABASE {alias}")
+
+def _fetch_table_stats(cursor: sqlite3.Cursor, schema: str) -> Tuple[Dict[str, int], Dict[str, List[str]]]:
+    """
+    Fetch the row count and column names of every table in an attached database.
+    
+    Column names for all tables come from a single sqlite_master/pragma_table_info
+    join, and row counts from batched UNION ALL queries.
+    
+    Args:
+        cursor: Cursor on the connection the database is attached to
+        schema: Schema name of the database ("main" or an ATTACH alias)
+        
+    Returns:
+        Tuple of (row counts by table, column names by table)
+    """
+    cursor.execute(
+        f"SELECT m.name, p.name FROM {schema}.sqlite_master AS m, pragma_table_info(m.name, ?) AS p "
+        "WHERE m.type = 'table' ORDER BY m.rowid, p.cid",
+        (schema,)
+    )
+    schemas = {}
+    for table, column in cursor.fetchall():
+        schemas.setdefault(table, []).append(column)
+    
+    counts = {}
+    tables = list(schemas)
+    for i in range(0, len(tables), COUNT_BATCH_SIZE):
+        batch = tables[i:i + COUNT_BATCH_SIZE]
+        cursor.execute(
+            " UNION ALL ".join(
+                f"SELECT ?, COUNT(*) FROM {schema}.{quote_ident(table)}" for table in batch
+            ),
+            batch
+        )
+        counts.update(cursor.fetchall())
+    
+    return counts, schemas
+
 def compare_databases(api_db_path: str, cli_db_path: str) -> Dict[str, Any]:
     """
     Compare API and CLI databases for structure and content.
@@ -87,8 +283,8 @@ def compare_databases(api_db_path: str, cli_db_path: str) -> Dict[str, Any]:
         "success": False,
         "table_comparison": {},
         "size_comparison": {
-            "api_db_size": os.path.getsize(api_db_path) if os.path.exists(api_db_path) else 0,
-            "cli_db_size": os.path.getsize(cli_db_path) if os.path.exists(cli_db_path) else 0,
+            "api_db_size": _file_size(api_db_path),
+            "cli_db_size": _file_size(cli_db_path),
         },
         "errors": []
     }
@@ -106,68 +302,65 @@ def compare_databases(api_db_path: str, cli_db_path: str) -> Dict[str, Any]:
             results["size_comparison"]["larger"] = "CLI"
     
     try:
-        # Get table structure and counts from API database
-        api_conn = sqlite3.connect(api_db_path)
-        api_cursor = api_conn.cursor()
-        
-        api_cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        api_tables = [table[0] for table in api_cursor.fetchall()]
-        
-        # Get table structure and counts from CLI database
-        cli_conn = sqlite3.connect(cli_db_path)
-        cli_cursor = cli_conn.cursor()
-        
-        cli_cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        cli_tables = [table[0] for table in cli_cursor.fetchall()]
-        
-        # Compare tables
-        all_tables = set(api_tables) | set(cli_tables)
-        for table in all_tables:
-            comparison = {
-                "exists_in_api": table in api_tables,
-                "exists_in_cli": table in cli_tables,
-                "api_count": 0,
-                "cli_count": 0,
-                "row_count_match": False,
-                "schema_match": False
-            }
-            
-            # Get row counts
-            if table in api_tables:
-                api_cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                comparison["api_count"] = api_cursor.fetchone()[0]
-                
-                # Get schema
-                api_cursor.execute(f"PRAGMA table_info({table})")
-                api_schema = api_cursor.fetchall()
-                comparison["api_schema"] = [col[1] for col in api_schema]  # Column names
-            
-            if table in cli_tables:
-                cli_cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                comparison["cli_count"] = cli_cursor.fetchone()[0]
-                
-                # Get schema
-                cli_cursor.execute(f"PRAGMA table_info({table})")
-                cli_schema = cli_cursor.fetchall()
-                comparison["cli_schema"] = [col[1] for col in cli_schema]  # Column names
-            
-            # Calculate differences
-            if comparison["exists_in_api"] and comparison["exists_in_cli"]:
-                comparison["row_count_match"] = comparison["api_count"] == comparison["cli_count"]
-                comparison["schema_match"] = comparison.get("api_schema", []) == comparison.get("cli_schema", [])
+        # Reuse the read-only API connection and attach the CLI database to it
+        conn = _read_only_connection(api_db_path)
+        with _attached(conn, cli_db_path, "cli"):
+            cursor = conn.cursor()
+            cursor.executescript(READ_ONLY_PRAGMAS)
+            
+            # Get table structure and counts from both databases
+            api_counts, api_schemas = _fetch_table_stats(cursor, "main")
+            cli_counts, cli_schemas = _fetch_table_stats(cursor, "cli")
+            
+            # Tables present in only one database, diffed by SQLite
+            cursor.execute(
+                "SELECT name FROM cli.sqlite_master WHERE type = 'table' "
+                "EXCEPT SELECT name FROM main.sqlite_master WHERE type = 'table'"
+            )
+            cli_only_tables = [row[0] for row in cursor.fetchall()]
+            
+            # Compare tables
+            all_tables = list(api_schemas) + cli_only_tables
+            for table in all_tables:
+                comparison = {
+                    "exists_in_api": table in api_schemas,
+                    "exists_in_cli": table in cli_schemas,
+                    "api_count": 0,
+                    "cli_count": 0,
+                    "row_count_match": False,
+                    "schema_match": False
+                }
+            
+                # Row counts and column names
+                if table in api_schemas:
+                    comparison["api_count"] = api_counts[table]
+                    comparison["api_schema"] = api_schemas[table]
+            
+                if table in cli_schemas:
+                    comparison["cli_count"] = cli_counts[table]
+                    comparison["cli_schema"] = cli_schemas[table]
+            
+                # Calculate differences
+                if comparison["exists_in_api"] and comparison["exists_in_cli"]:
+                    comparison["row_count_match"] = comparison["api_count"] == comparison["cli_count"]
+                    comparison["schema_match"] = comparison.get("api_schema", []) == comparison.get("cli_schema", [])
                 
-                if not comparison["schema_match"] and 'api_schema' in comparison and 'cli_schema' in comparison:
-                    # Find schema differences
-                    api_set = set(comparison["api_schema"])
-                    cli_set = set(comparison["cli_schema"])
-                    comparison["api_only_columns"] = list(api_set - cli_set)
-                    comparison["cli_only_columns"] = list(cli_set - api_set)
-            
-            results["table_comparison"][table] = comparison
-        
-        # Close connections
-        api_conn.close()
-        cli_conn.close()
+                    if not comparison["schema_match"]:
+                        # Find schema differences
+                        cursor.execute(
+                            "SELECT name FROM pragma_table_info(?, 'main') "
+                            "EXCEPT SELECT name FROM pragma_table_info(?, 'cli')",
+                            (table, table)
+                        )
+                        comparison["api_only_columns"] = [row[0] for row in cursor.fetchall()]
+                        cursor.execute(
+                            "SELECT name FROM pragma_table_info(?, 'cli') "
+                            "EXCEPT SELECT name FROM pragma_table_info(?, 'main')",
+                            (table, table)
+                        )
+                        comparison["cli_only_columns"] = [row[0] for row in cursor.fetchall()]
+            
+                results["table_comparison"][table] = comparison
         
         # Overall success criteria
         table_matches = []
@@ -187,6 +380,9 @@ def compare_file_reconstructions(api_recon_dir: str, cli_recon_dir: str) -> Dict
     """
     Compare file reconstructions between API and CLI.
     
+    Per-file results are stored column-wise in "file_details": a dict mapping
+    each FILE_DETAIL_COLUMNS name to a list with one entry per common file.
+    
     Args:
         api_recon_dir: API reconstruction directory
         cli_recon_dir: CLI reconstruction directory
@@ -203,86 +399,47 @@ def compare_file_reconstructions(api_recon_dir: str, cli_recon_dir: str) -> Dict
         "different_files": 0,
         "api_only_files": 0,
         "cli_only_files": 0,
-        "file_details": []
+        "api_recon_dir": api_recon_dir,
+        "cli_recon_dir": cli_recon_dir,
+        "file_details": {column: [] for column in FILE_DETAIL_COLUMNS}
     }
     
     try:
-        # Get API files
-        api_files = {}
-        if os.path.exists(api_recon_dir):
-            for root, _, files in os.walk(api_recon_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, api_recon_dir)
-                    api_files[rel_path] = file_path
-        
-        # Get CLI files
-        cli_files = {}
-        if os.path.exists(cli_recon_dir):
-            for root, _, files in os.walk(cli_recon_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, cli_recon_dir)
-                    cli_files[rel_path] = file_path
+        # Get API and CLI file names (relative paths); missing directories are empty
+        api_file_names = frozenset(rel_path for _, rel_path in iter_files(api_recon_dir))
+        cli_file_names = frozenset(rel_path for _, rel_path in iter_files(cli_recon_dir))
         
         # Update counts
-        results["api_files"] = len(api_files)
-        results["cli_files"] = len(cli_files)
+        results["api_files"] = len(api_file_names)
+        results["cli_files"] = len(cli_file_names)
         
         # Find common files
-        api_file_names = set(api_files.keys())
-        cli_file_names = set(cli_files.keys())
-        common_files = api_file_names & cli_file_names
-        api_only = api_file_names - cli_file_names
-        cli_only = cli_file_names - api_file_names
+        common_files = api_file_names.intersection(cli_file_names)
+        api_only = api_file_names.difference(cli_file_names)
+        cli_only = cli_file_names.difference(api_file_names)
         
         results["common_files"] = len(common_files)
         results["api_only_files"] = len(api_only)
         results["cli_only_files"] = len(cli_only)
         
-        # Calculate file hashes for common files
-        for filename in common_files:
-            api_path = api_files[filename]
-            cli_path = cli_files[filename]
-            
-            # Calculate hashes
-            try:
-                api_hash = hashlib.sha256()
-                with open(api_path, 'rb') as f:
-                    for chunk in iter(lambda: f.read(4096), b''):
-                        api_hash.update(chunk)
-                api_hash = api_hash.hexdigest()
-                
-                cli_hash = hashlib.sha256()
-                with open(cli_path, 'rb') as f:
-                    for chunk in iter(lambda: f.read(4096), b''):
-                        cli_hash.update(chunk)
-                cli_hash = cli_hash.hexdigest()
-                
-                # Compare hashes
-                identical = api_hash == cli_hash
-                if identical:
-                    results["identical_files"] += 1
-                else:
-                    results["different_files"] += 1
-                
-                results["file_details"].append({
-                    "filename": filename,
-                    "api_path": api_path,
-                    "cli_path": cli_path,
-                    "api_hash": api_hash,
-                    "cli_hash": cli_hash,
-                    "identical": identical
-                })
-                
-            except Exception as e:
-                logger.error(f"Error comparing file {filename}: {e}")
-                results["file_details"].append({
-                    "filename": filename,
-                    "api_path": api_path,
-                    "cli_path": cli_path,
-                    "error": str(e)
-                })
+        # Calculate file hashes for common files in parallel
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            rows = executor.map(
+                lambda filename: _compare_file_pair(
+                    filename,
+                    os.path.join(api_recon_dir, filename),
+                    os.path.join(cli_recon_dir, filename)
+                ),
+                common_files
+            )
+            columns = [results["file_details"][column] for column in FILE_DETAIL_COLUMNS]
+            for row in rows:
+                for column, value in zip(columns, row):
+                    column.append(value)
+        
+        identical = results["file_details"]["identical"]
+        results["identical_files"] = identical.count(True)
+        results["different_files"] = identical.count(False)
         
         # Success criteria: All common files are identical
         if results["common_files"] > 0:
@@ -332,7 +489,7 @@ def compare_performance_metrics(api_metrics: Dict, cli_metrics: Dict) -> Dict[st
     api_ops = api_metrics.get("operations", {})
     cli_ops = cli_metrics.get("operations", {})
     
-    all_ops = set(api_ops.keys()) | set(cli_ops.keys())
+    all_ops = frozenset(api_ops).union(cli_ops)
     for op in all_ops:
         op_result = {
             "exists_in_api": op in api_ops,
@@ -366,6 +523,56 @@ def compare_performance_metrics(api_metrics: Dict, cli_metrics: Dict) -> Dict[st
     
     return results
 
+# Markdown row templates and check marks (indexed by bool) for the report tables
+_TICK = ("✗", "✓")
+_SEVEN_COLUMN_ROW = "| {} | {} | {} | {} | {} | {} | {} |\n".format
+_FILE_ROW = "| {} | {} | {} |\n".format
+
+def _table_comparison_row(table: str, details: Dict[str, Any]) -> str:
+    """Format one row of the table structure comparison."""
+    get = details.get
+    return _SEVEN_COLUMN_ROW(
+        table,
+        _TICK[bool(get("exists_in_api", False))],
+        _TICK[bool(get("exists_in_cli", False))],
+        get("api_count", "N/A"),
+        get("cli_count", "N/A"),
+        _TICK[bool(get("schema_match", False))],
+        _TICK[bool(get("row_count_match", False))],
+    )
+
+def _operation_row(op: str, details: Dict[str, Any]) -> str:
+    """Format one row of the operation performance comparison."""
+    get = details.get
+    api_dur = get("api_duration", "N/A")
+    cli_dur = get("cli_duration", "N/A")
+    ratio = get("ratio", "N/A")
+    
+    if api_dur != "N/A":
+        api_dur = f"{api_dur:.2f}"
+    
+    if cli_dur != "N/A":
+        cli_dur = f"{cli_dur:.2f}"
+    
+    if ratio != "N/A":
+        ratio = f"{ratio:.2f}x"
+    
+    return _SEVEN_COLUMN_ROW(op, api_dur, cli_dur, get("api_count", "N/A"), get("cli_count", "N/A"),
+                             get("faster", "N/A"), ratio)
+
+def _different_file_row(file_details: Dict[str, List], i: int) -> str:
+    """Format row i of the file_details columns for the different files table."""
+    api_hash = file_details["api_hash"][i]
+    cli_hash = file_details["cli_hash"][i]
+    if api_hash is None:
+        # Hashing was skipped, so show the sizes that tell the files apart
+        api_hash = f"size {file_details['api_size'][i]:,} bytes"
+        cli_hash = f"size {file_details['cli_size'][i]:,} bytes"
+    else:
+        api_hash = api_hash.hex()
+        cli_hash = cli_hash.hex()
+    return _FILE_ROW(file_details["filename"][i], api_hash, cli_hash)
+
 def generate_detailed_comparison_report(comparison_results: Dict[str, Any], output_file: str) -> None:
     """
     Generate a detailed Markdown report of comparison test results.
@@ -375,183 +582,157 @@ def generate_detailed_comparison_report(comparison_results: Dict[str, Any], outp
         output_file: Output file path
     """
     try:
-        with open(output_file, 'w') as f:
-            f.write("# API vs CLI Comparison Test Report\n\n")
-            f.write(f"Test performed on: {datetime.now().strftime('%Y-%m-%d')}\n\n")
-            
-            # Test directory
-            f.write(f"Test directory: {comparison_results.get('input_dir', 'Unknown')}\n\n")
-            
-            # Executive Summary
-            f.write("## Executive Summary\n\n")
-            
-            if 'overall_success' in comparison_results:
-                success = comparison_results['overall_success']
-                f.write(f"Overall comparison result: **{'Success' if success else 'Failure'}**\n\n")
-            
-            if 'performance_comparison' in comparison_results and 'overall' in comparison_results['performance_comparison']:
-                perf = comparison_results['performance_comparison']['overall']
-                f.write("### Performance Summary\n\n")
-                f.write(f"- API total duration: {perf.get('api_total_duration', 0):.2f} seconds\n")
-                f.write(f"- CLI total duration: {perf.get('cli_total_duration', 0):.2f} seconds\n")
-                
-                if 'faster' in perf and 'ratio' in perf:
-                    f.write(f"- {perf['faster']} was {perf['ratio']:.2f}x faster overall\n\n")
-            
-            if 'database_comparison' in comparison_results and 'size_comparison' in comparison_results['database_comparison']:
-                size = comparison_results['database_comparison']['size_comparison']
-                f.write("### Database Size Comparison\n\n")
-                f.write(f"- API database size: {size.get('api_db_size', 0):,} bytes\n")
-                f.write(f"- CLI database size: {size.get('cli_db_size', 0):,} bytes\n")
-                
-                if 'larger' in size and 'ratio' in size:
-                    f.write(f"- {size['larger']} database is {size['ratio']:.2f}x larger\n\n")
-            
-            if 'file_comparison' in comparison_results:
-                file = comparison_results['file_comparison']
-                f.write("### File Reconstruction Summary\n\n")
-                f.write(f"- API reconstructed files: {file.get('api_files', 0)}\n")
-                f.write(f"- CLI reconstructed files: {file.get('cli_files', 0)}\n")
-                f.write(f"- Common files: {file.get('common_files', 0)}\n")
-                f.write(f"- Identical files: {file.get('identical_files', 0)}\n")
-                f.write(f"- Different files: {file.get('different_files', 0)}\n\n")
-            
-            # Key findings and issues
-            if comparison_results.get('findings', []):
-                f.write("### Key Findings\n\n")
-                for finding in comparison_results['findings']:
-                    f.write(f"- {finding}\n")
-                f.write("\n")
-            
-            if comparison_results.get('issues', []):
-                f.write("### Issues Identified\n\n")
-                for issue in comparison_results['issues']:
-                    f.write(f"- {issue}\n")
-                f.write("\n")
-            
-            # Database comparison
-            f.write("## Database Comparison\n\n")
-            db_comp = comparison_results.get('database_comparison', {})
-            table_comp = db_comp.get('table_comparison', {})
-            
-            if table_comp:
-                f.write("### Table Structure Comparison\n\n")
-                f.write("| Table | In API | In CLI | API Rows | CLI Rows | Schema Match | Row Count Match |\n")
-                f.write("|-------|--------|--------|----------|----------|--------------|----------------|\n")
-                
-                for table, details in table_comp.items():
-                    in_api = "✓" if details.get("exists_in_api", False) else "✗"
-                    in_cli = "✓" if details.get("exists_in_cli", False) else "✗"
-                    api_count = details.get("api_count", "N/A")
-                    cli_count = details.get("cli_count", "N/A")
-                    schema_match = "✓" if details.get("schema_match", False) else "✗"
-                    count_match = "✓" if details.get("row_count_match", False) else "✗"
-                    
-                    f.write(f"| {table} | {in_api} | {in_cli} | {api_count} | {cli_count} | {schema_match} | {count_match} |\n")
-                
-                f.write("\n")
-                
-                # Schema differences
-                schema_diffs = False
-                for table, details in table_comp.items():
-                    if details.get("exists_in_api", False) and details.get("exists_in_cli", False) and not details.get("schema_match", True):
-                        if not schema_diffs:
-                            f.write("### Schema Differences\n\n")
-                            schema_diffs = True
-                        
-                        f.write(f"**Table: {table}**\n\n")
-                        
-                        api_only = details.get("api_only_columns", [])
-                        cli_only = details.get("cli_only_columns", [])
-                        
-                        if api_only:
-                            f.write("API-only columns:\n")
-                            for col in api_only:
-                                f.write(f"- {col}\n")
-                            f.write("\n")
-                        
-                        if cli_only:
-                            f.write("CLI-only columns:\n")
-                            for col in cli_only:
-                                f.write(f"- {col}\n")
-                            f.write("\n")
-            
-            # Performance comparison
-            f.write("## Performance Comparison\n\n")
-            perf_comp = comparison_results.get('performance_comparison', {})
-            op_comp = perf_comp.get('operations', {})
-            
-            if op_comp:
-                f.write("### Operation Performance\n\n")
-                f.write("| Operation | API Duration (s) | CLI Duration (s) | API Count | CLI Count | Faster | Ratio |\n")
-                f.write("|-----------|-----------------|------------------|-----------|-----------|--------|-------|\n")
-                
-                for op, details in op_comp.items():
-                    api_dur = details.get("api_duration", "N/A")
-                    cli_dur = details.get("cli_duration", "N/A")
-                    
-                    if api_dur != "N/A":
-                        api_dur = f"{api_dur:.2f}"
-                    
-                    if cli_dur != "N/A":
-                        cli_dur = f"{cli_dur:.2f}"
-                    
-                    api_count = details.get("api_count", "N/A")
-                    cli_count = details.get("cli_count", "N/A")
-                    faster = details.get("faster", "N/A")
-                    ratio = details.get("ratio", "N/A")
+        parts = []
+        w = parts.append
+        
+        w("# API vs CLI Comparison Test Report\n\n")
+        w(f"Test performed on: {datetime.now().strftime('%Y-%m-%d')}\n\n")
+        
+        # Test directory
+        w(f"Test directory: {comparison_results.get('input_dir', 'Unknown')}\n\n")
+        
+        # Executive Summary
+        w("## Executive Summary\n\n")
+        
+        if 'overall_success' in comparison_results:
+            success = comparison_results['overall_success']
+            w(f"Overall comparison result: **{'Success' if success else 'Failure'}**\n\n")
+        
+        if 'performance_comparison' in comparison_results and 'overall' in comparison_results['performance_comparison']:
+            perf = comparison_results['performance_comparison']['overall']
+            w("### Performance Summary\n\n")
+            w(f"- API total duration: {perf.get('api_total_duration', 0):.2f} seconds\n")
+            w(f"- CLI total duration: {perf.get('cli_total_duration', 0):.2f} seconds\n")
+            
+            if 'faster' in perf and 'ratio' in perf:
+                w(f"- {perf['faster']} was {perf['ratio']:.2f}x faster overall\n\n")
+        
+        if 'database_comparison' in comparison_results and 'size_comparison' in comparison_results['database_comparison']:
+            size = comparison_results['database_comparison']['size_comparison']
+            w("### Database Size Comparison\n\n")
+            w(f"- API database size: {size.get('api_db_size', 0):,} bytes\n")
+            w(f"- CLI database size: {size.get('cli_db_size', 0):,} bytes\n")
+            
+            if 'larger' in size and 'ratio' in size:
+                w(f"- {size['larger']} database is {size['ratio']:.2f}x larger\n\n")
+        
+        if 'file_comparison' in comparison_results:
+            file = comparison_results['file_comparison']
+            w("### File Reconstruction Summary\n\n")
+            w(f"- API reconstructed files: {file.get('api_files', 0)}\n")
+            w(f"- CLI reconstructed files: {file.get('cli_files', 0)}\n")
+            w(f"- Common files: {file.get('common_files', 0)}\n")
+            w(f"- Identical files: {file.get('identical_files', 0)}\n")
+            w(f"- Different files: {file.get('different_files', 0)}\n\n")
+        
+        # Key findings and issues
+        if comparison_results.get('findings', []):
+            w("### Key Findings\n\n")
+            for finding in comparison_results['findings']:
+                w(f"- {finding}\n")
+            w("\n")
+        
+        if comparison_results.get('issues', []):
+            w("### Issues Identified\n\n")
+            for issue in comparison_results['issues']:
+                w(f"- {issue}\n")
+            w("\n")
+        
+        # Database comparison
+        w("## Database Comparison\n\n")
+        db_comp = comparison_results.get('database_comparison', {})
+        table_comp = db_comp.get('table_comparison', {})
+        
+        if table_comp:
+            w("### Table Structure Comparison\n\n")
+            w("| Table | In API | In CLI | API Rows | CLI Rows | Schema Match | Row Count Match |\n")
+            w("|-------|--------|--------|----------|----------|--------------|----------------|\n")
+            
+            w("".join([_table_comparison_row(table, details) for table, details in table_comp.items()]))
+            w("\n")
+            
+            # Schema differences
+            schema_diffs = False
+            for table, details in table_comp.items():
+                if details.get("exists_in_api", False) and details.get("exists_in_cli", False) and not details.get("schema_match", True):
+                    if not schema_diffs:
+                        w("### Schema Differences\n\n")
+                        schema_diffs = True
                     
-                    if ratio != "N/A":
-                        ratio = f"{ratio:.2f}x"
+                    w(f"**Table: {table}**\n\n")
                     
-                    f.write(f"| {op} | {api_dur} | {cli_dur} | {api_count} | {cli_count} | {faster} | {ratio} |\n")
-                
-                f.write("\n")
-            
-            # File reconstruction comparison
-            file_comp = comparison_results.get('file_comparison', {})
-            file_details = file_comp.get('file_details', [])
-            
-            if file_details:
-                # First, list any different files
-                diff_files = [file for file in file_details if file.get('identical', True) == False]
-                if diff_files:
-                    f.write("## Different Files\n\n")
-                    f.write("| Filename | API Hash | CLI Hash |\n")
-                    f.write("|----------|---------|----------|\n")
+                    api_only = details.get("api_only_columns", [])
+                    cli_only = details.get("cli_only_columns", [])
                     
-                    for file in diff_files:
-                        filename = file.get('filename', 'Unknown')
-                        api_hash = file.get('api_hash', 'N/A')
-                        cli_hash = file.get('cli_hash', 'N/A')
-                        
-                        f.write(f"| {filename} | {api_hash} | {cli_hash} |\n")
+                    if api_only:
+                        w("API-only columns:\n")
+                        for col in api_only:
+                            w(f"- {col}\n")
+                        w("\n")
                     
-                    f.write("\n")
-            
-            # Errors section
-            all_errors = []
-            for section_name, section_data in comparison_results.items():
-                if isinstance(section_data, dict) and 'errors' in section_data:
-                    for error in section_data['errors']:
-                        all_errors.append(f"{section_name}: {error}")
-                elif isinstance(section_data, dict) and 'error' in section_data:
-                    all_errors.append(f"{section_name}: {section_data['error']}")
-            
-            if all_errors:
-                f.write("## Errors\n\n")
-                for error in all_errors:
-                    f.write(f"- {error}\n")
-                f.write("\n")
-            
-            # Recommendations
-            if comparison_results.get('recommendations', []):
-                f.write("## Recommendations\n\n")
-                for i, rec in enumerate(comparison_results['recommendations'], 1):
-                    f.write(f"{i}. {rec}\n")
-            
-            logger.info(f"Detailed comparison report generated at {output_file}")
+                    if cli_only:
+                        w("CLI-only columns:\n")
+                        for col in cli_only:
+                            w(f"- {col}\n")
+                        w("\n")
+        
+        # Performance comparison
+        w("## Performance Comparison\n\n")
+        perf_comp = comparison_results.get('performance_comparison', {})
+        op_comp = perf_comp.get('operations', {})
+        
+        if op_comp:
+            w("### Operation Performance\n\n")
+            w("| Operation | API Duration (s) | CLI Duration (s) | API Count | CLI Count | Faster | Ratio |\n")
+            w("|-----------|-----------------|------------------|-----------|-----------|--------|-------|\n")
             
+            w("".join([_operation_row(op, details) for op, details in op_comp.items()]))
+            w("\n")
+        
+        # File reconstruction comparison
+        file_comp = comparison_results.get('file_comparison', {})
+        file_details = file_comp.get('file_details', {})
+        
+        if file_details:
+            # First, list any different files
+            diff_rows = [i for i, identical in enumerate(file_details['identical']) if identical is False]
+            if diff_rows:
+                w("## Different Files\n\n")
+                w("| Filename | API Hash | CLI Hash |\n")
+                w("|----------|---------|----------|\n")
+                
+                w("".join([_different_file_row(file_details, i) for i in diff_rows]))
+                w("\n")
+        
+        # Errors section
+        all_errors = []
+        for section_name in REPORT_ERROR_SECTIONS:
+            section_data = comparison_results.get(section_name)
+            if not isinstance(section_data, dict):
+                continue
+            if 'errors' in section_data:
+                for error in section_data['errors']:
+                    all_errors.append(f"{section_name}: {error}")
+            elif 'error' in section_data:
+                all_errors.append(f"{section_name}: {section_data['error']}")
+        
+        if all_errors:
+            w("## Errors\n\n")
+            for error in all_errors:
+                w(f"- {error}\n")
+            w("\n")
+        
+        # Recommendations
+        if comparison_results.get('recommendations', []):
+            w("## Recommendations\n\n")
+            for i, rec in enumerate(comparison_results['recommendations'], 1):
+                w(f"{i}. {rec}\n")
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+        
+        logger.info(f"Detailed comparison report generated at {output_file}")
+        
     except Exception as e:
         logger.error(f"Failed to generate detailed comparison report: {e}")
 
@@ -575,6 +756,7 @@ def run_api_cli_comparison(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict
     os.makedirs(cli_dir, exist_ok=True)
     
     logger.info(f"Starting API vs CLI comparison test on {input_dir}")
+    perf_start = time.perf_counter()
     comparison_results = {
         "input_dir": input_dir,
         "output_dir": output_dir,
@@ -701,9 +883,6 @@ def run_api_cli_comparison(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict
                 cli_test.performance.metrics
             )
         
-        # Generate detailed report
-        generate_detailed_comparison_report(comparison_results, DETAILED_REPORT)
-        
         # Process findings and recommendations based on results
         
         # Database size findings
@@ -716,14 +895,9 @@ def run_api_cli_comparison(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict
                 comparison_results["findings"].append(
                     f"The {larger} database is {ratio:.2f}x larger than the other interface's database"
                 )
-                if larger == "CLI":
-                    comparison_results["recommendations"].append(
-                        "Investigate CLI database storage efficiency; consider adopting API storage optimizations"
-                    )
-                else:
-                    comparison_results["recommendations"].append(
-                        "Investigate API database storage efficiency; consider adopting CLI storage optimizations"
-                    )
+                comparison_results["recommendations"].append(
+                    _RECOMMENDATION_TEMPLATES["storage"].format(larger=larger, other=_OTHER_INTERFACE[larger])
+                )
         
         # Performance findings
         perf_comp = comparison_results.get('performance_comparison', {})
@@ -735,16 +909,16 @@ def run_api_cli_comparison(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict
                 comparison_results["findings"].append(
                     f"The {faster} interface is {ratio:.2f}x faster overall than the other interface"
                 )
-                slower = "API" if faster == "CLI" else "CLI"
                 comparison_results["recommendations"].append(
-                    f"Optimize {slower} performance; investigate bottlenecks compared to {faster} implementation"
+                    _RECOMMENDATION_TEMPLATES["performance"].format(slower=_OTHER_INTERFACE[faster], faster=faster)
                 )
         
         # Check if any operations have significant performance differences
         for op, details in perf_comp.get('operations', {}).items():
             if 'faster' in details and 'ratio' in details and details['ratio'] > 2.0:
                 comparison_results["findings"].append(
-                    f"Operation '{op}' is {details['ratio']:.2f}x faster in {details['faster']} than in {'API' if details['faster'] == 'CLI' else 'CLI'}"
+                    f"Operation '{op}' is {details['ratio']:.2f}x faster in {details['faster']} "
+                    f"than in {_OTHER_INTERFACE[details['faster']]}"
                 )
         
         # File reconstruction findings
@@ -779,18 +953,14 @@ def run_api_cli_comparison(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict
         comparison_results["overall_success"] = db_success and file_success and len(comparison_results["issues"]) == 0
         
         comparison_results["end_time"] = datetime.now().isoformat()
-        comparison_results["duration"] = (
-            datetime.fromisoformat(comparison_results["end_time"]) - 
-            datetime.fromisoformat(comparison_results["start_time"])
-        ).total_seconds()
+        comparison_results["duration"] = time.perf_counter() - perf_start
+        
+        # Generate detailed report
+        generate_detailed_comparison_report(comparison_results, DETAILED_REPORT)
         
         # Save full results
         results_file = os.path.join(output_dir, "api_cli_comparison_results.json")
-        with open(results_file, 'w') as f:
-            # Convert any objects that aren't JSON serializable (like datetime.timedelta)
-            json_results = {k: (str(v) if not isinstance(v, (dict, list, str, int, float, bool, type(None))) else v) 
-                          for k, v in comparison_results.items()}
-            json.dump(json_results, f, indent=2)
+        write_json(results_file, comparison_results)
         
         logger.info(f"API vs CLI comparison test completed in {comparison_results['duration']:.2f} seconds")
         logger.info(f"Results saved to {results_file}")
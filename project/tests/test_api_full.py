@@ -9,11 +9,11 @@ It tests all aspects of the API including scanning, querying, and file reconstru
 import os
 import sys
 import time
-import json
 import logging
 import argparse
-import hashlib
+import contextlib
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
@@ -39,85 +39,18 @@ except ImportError as e:
     logger.error(f"Failed to import API test framework: {e}")
     sys.exit(1)
 
+from project.tests.common import iter_failed_files, quote_ident, read_only_uri, verify_files, write_json
+
 # Default test directory - update as needed
 DEFAULT_TEST_DIR = os.path.join(root_dir, "tests", "test_data")
 # Output directory for test results
 OUTPUT_DIR = os.path.join(project_dir, "test_results", "api")
 # Detailed report file
 DETAILED_REPORT = os.path.join(OUTPUT_DIR, "API_DETAILED_TEST_REPORT.md")
-
-def calculate_file_hash(file_path: str) -> Optional[str]:
-    """Calculate SHA-256 hash of a file."""
-    try:
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-    except Exception as e:
-        logger.error(f"Error calculating hash for {file_path}: {e}")
-        return None
-
-def verify_files(source_dir: str, reconstructed_dir: str) -> Dict[str, Any]:
-    """
-    Verify reconstructed files match the originals.
-    
-    Args:
-        source_dir: Original source directory
-        reconstructed_dir: Directory with reconstructed files
-        
-    Returns:
-        Dictionary with verification results
-    """
-    logger.info(f"Verifying reconstructed files against originals in {source_dir}")
-    results = {
-        "total_files": 0,
-        "verified_files": 0,
-        "failed_files": 0,
-        "missing_files": 0,
-        "file_details": []
-    }
-    
-    # Get original files
-    original_files = {}
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, source_dir)
-            original_files[rel_path] = file_path
-    
-    results["total_files"] = len(original_files)
-    
-    # Check reconstructed files
-    for rel_path, orig_path in original_files.items():
-        recon_path = os.path.join(reconstructed_dir, os.path.basename(orig_path))
-        
-        file_result = {
-            "original_path": orig_path,
-            "reconstructed_path": recon_path,
-            "status": "missing"
-        }
-        
-        if os.path.exists(recon_path):
-            orig_hash = calculate_file_hash(orig_path)
-            recon_hash = calculate_file_hash(recon_path)
-            
-            if orig_hash and recon_hash and orig_hash == recon_hash:
-                file_result["status"] = "verified"
-                results["verified_files"] += 1
-            else:
-                file_result["status"] = "failed"
-                file_result["original_hash"] = orig_hash
-                file_result["reconstructed_hash"] = recon_hash
-                results["failed_files"] += 1
-        else:
-            results["missing_files"] += 1
-        
-        results["file_details"].append(file_result)
-    
-    logger.info(f"File verification: {results['verified_files']} verified, "
-                f"{results['failed_files']} failed, {results['missing_files']} missing")
-    return results
+# Bytes of the database memory-mapped during the integrity check
+MMAP_SIZE = 256 * 1024 * 1024
+# Tables counted per UNION ALL statement (SQLite caps compound SELECTs at 500 terms)
+COUNT_BATCH_SIZE = 200
 
 def test_database_integrity(db_path: str) -> Dict[str, Any]:
     """
@@ -137,27 +70,32 @@ def test_database_integrity(db_path: str) -> Dict[str, Any]:
     }
     
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Check foreign key integrity
-        cursor.execute("PRAGMA foreign_key_check")
-        fk_violations = cursor.fetchall()
-        if fk_violations:
-            results["foreign_keys"] = False
-            results["errors"].append(f"Foreign key violations found: {fk_violations}")
-        
-        # Get all tables and their row counts
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            results["tables"][table_name] = count
-        
-        conn.close()
+        # Open read-only so no write lock or journal is involved
+        with contextlib.closing(sqlite3.connect(read_only_uri(db_path), uri=True)) as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA query_only = 1")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+            cursor.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            
+            # Check foreign key integrity
+            cursor.execute("PRAGMA foreign_key_check")
+            fk_violations = cursor.fetchall()
+            if fk_violations:
+                results["foreign_keys"] = False
+                results["errors"].append(f"Foreign key violations found: {fk_violations}")
+            
+            # Get all tables and their row counts, counting a batch of tables per query
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            table_names = [row[0] for row in cursor.fetchall()]
+            
+            for i in range(0, len(table_names), COUNT_BATCH_SIZE):
+                batch = table_names[i:i + COUNT_BATCH_SIZE]
+                cursor.execute(
+                    " UNION ALL ".join(f"SELECT ?, COUNT(*) FROM {quote_ident(table)}" for table in batch),
+                    batch
+                )
+                results["tables"].update(cursor.fetchall())
+        
         results["success"] = True
         logger.info(f"Database integrity check completed successfully")
         
@@ -167,12 +105,12 @@ def test_database_integrity(db_path: str) -> Dict[str, Any]:
     
     return results
 
-def test_xml_and_lk_modules(api_test: MODMetaAPITest) -> Dict[str, Any]:
+def test_xml_and_lk_modules(modules: List[Any]) -> Dict[str, Any]:
     """
     Test handling of XML and LK modules specifically.
     
     Args:
-        api_test: Initialized API test framework instance
+        modules: Modules returned by the API test framework's get_all_modules()
         
     Returns:
         Dictionary with test results
@@ -186,21 +124,21 @@ def test_xml_and_lk_modules(api_test: MODMetaAPITest) -> Dict[str, Any]:
     }
     
     try:
-        # Get all modules
-        modules, _ = api_test.get_all_modules()
-        
-        # Filter for XML and LK modules
+        # Filter for XML and LK modules, reading each attribute once per module
         for module in modules:
-            if module.source_file:
-                ext = os.path.splitext(module.source_file)[1].lower()
-                if ext == '.xml':
-                    results["xml_modules"] += 1
-                    if hasattr(module, 'raw_content') and module.raw_content:
-                        results["xml_with_content"] += 1
-                elif ext == '.lk':
-                    results["lk_modules"] += 1
-                    if hasattr(module, 'raw_content') and module.raw_content:
-                        results["lk_with_content"] += 1
+            source_file = module.source_file
+            if not source_file:
+                continue
+            # Only the last four characters can hold ".xml" or ".lk"
+            tail = source_file[-4:].lower()
+            if tail.endswith('.xml'):
+                results["xml_modules"] += 1
+                if getattr(module, 'raw_content', None):
+                    results["xml_with_content"] += 1
+            elif tail.endswith('.lk'):
+                results["lk_modules"] += 1
+                if getattr(module, 'raw_content', None):
+                    results["lk_with_content"] += 1
         
         results["success"] = True
         logger.info(f"Found {results['xml_modules']} XML modules and {results['lk_modules']} LK modules")
@@ -211,12 +149,12 @@ def test_xml_and_lk_modules(api_test: MODMetaAPITest) -> Dict[str, Any]:
     
     return results
 
-def test_block_parsing(api_test: MODMetaAPITest) -> Dict[str, Any]:
+def test_block_parsing(modules: List[Any]) -> Dict[str, Any]:
     """
     Test block parsing functionality.
     
     Args:
-        api_test: Initialized API test framework instance
+        modules: Modules returned by the API test framework's get_all_modules()
         
     Returns:
         Dictionary with test results
@@ -231,22 +169,20 @@ def test_block_parsing(api_test: MODMetaAPITest) -> Dict[str, Any]:
     }
     
     try:
-        # Get all modules
-        modules, _ = api_test.get_all_modules()
         results["total_modules"] = len(modules)
         
-        # Check for metadata and parameters
+        # Check for metadata and parameters, reading each attribute once per module
         for module in modules:
-            has_metadata = hasattr(module, 'metadata') and module.metadata
-            has_parameters = hasattr(module, 'parameters') and module.parameters
+            metadata = getattr(module, 'metadata', None)
+            parameters = getattr(module, 'parameters', None)
             
-            if has_metadata:
+            if metadata:
                 results["modules_with_metadata"] += 1
-                results["total_metadata"] += len(module.metadata)
+                results["total_metadata"] += len(metadata)
             
-            if has_parameters:
+            if parameters:
                 results["modules_with_parameters"] += 1
-                results["total_parameters"] += len(module.parameters)
+                results["total_parameters"] += len(parameters)
         
         results["success"] = True
         logger.info(f"Block parsing test completed: {results['modules_with_metadata']} modules with metadata, "
@@ -258,6 +194,10 @@ def test_block_parsing(api_test: MODMetaAPITest) -> Dict[str, Any]:
     
     return results
 
+# Markdown templates for the repeated rows of the detailed report
+_TABLE_ROW = "| {} | {} |\n".format
+_FAILED_FILE_ENTRY = "- {}\n  - Original hash: {}\n  - Reconstructed hash: {}\n\n".format
+
 def generate_detailed_report(all_results: Dict[str, Any], output_file: str) -> None:
     """
     Generate a detailed Markdown report of all test results.
@@ -267,94 +207,98 @@ def generate_detailed_report(all_results: Dict[str, Any], output_file: str) -> N
         output_file: Output file path
     """
     try:
-        with open(output_file, 'w') as f:
-            f.write("# Detailed API Test Report\n\n")
-            f.write(f"Test performed on: {datetime.now().strftime('%Y-%m-%d')}\n\n")
-            
-            # Test directory
-            f.write(f"Test directory: {all_results.get('input_dir', 'Unknown')}\n\n")
-            
-            # Summary of performance
-            f.write("## Performance Summary\n\n")
-            perf = all_results.get('performance', {}).get('metrics', {})
-            if perf:
-                f.write(f"Total test duration: {perf.get('total_duration', 0):.2f} seconds\n\n")
-                
-                f.write("| Operation | Count | Duration (s) | Rate |\n")
-                f.write("|-----------|-------|-------------|------|\n")
-                
-                for op_name, op_metrics in perf.get('operations', {}).items():
-                    count = op_metrics.get('count', 0)
-                    duration = op_metrics.get('total_duration', 0)
-                    rate = ""
-                    if 'data_rate' in op_metrics and op_metrics['data_rate'] > 0:
-                        rate = f"{op_metrics['data_rate']:.2f} bytes/sec"
-                    
-                    f.write(f"| {op_name} | {count} | {duration:.2f} | {rate} |\n")
-                
-                f.write("\n")
+        parts = []
+        w = parts.append
+        
+        w("# Detailed API Test Report\n\n")
+        w(f"Test performed on: {datetime.now().strftime('%Y-%m-%d')}\n\n")
+        
+        # Test directory
+        w(f"Test directory: {all_results.get('input_dir', 'Unknown')}\n\n")
+        
+        # Summary of performance
+        w("## Performance Summary\n\n")
+        perf = all_results.get('performance', {}).get('metrics', {})
+        if perf:
+            w(f"Total test duration: {perf.get('total_duration', 0):.2f} seconds\n\n")
             
-            # Database details
-            f.write("## Database Statistics\n\n")
-            db_stats = all_results.get('database_integrity', {}).get('tables', {})
-            if db_stats:
-                f.write("| Table Name | Count |\n")
-                f.write("|------------|-------|\n")
-                
-                for table, count in db_stats.items():
-                    f.write(f"| {table} | {count} |\n")
-                
-                f.write("\n")
+            w("| Operation | Count | Duration (s) | Rate |\n")
+            w("|-----------|-------|-------------|------|\n")
             
-            # File verification results
-            f.write("## File Reconstruction Results\n\n")
-            file_results = all_results.get('file_verification', {})
-            if file_results:
-                f.write(f"Total files: {file_results.get('total_files', 0)}\n")
-                f.write(f"Verified files: {file_results.get('verified_files', 0)}\n")
-                f.write(f"Failed files: {file_results.get('failed_files', 0)}\n")
-                f.write(f"Missing files: {file_results.get('missing_files', 0)}\n\n")
+            for op_name, op_metrics in perf.get('operations', {}).items():
+                count = op_metrics.get('count', 0)
+                duration = op_metrics.get('total_duration', 0)
+                rate = ""
+                if 'data_rate' in op_metrics and op_metrics['data_rate'] > 0:
+                    rate = f"{op_metrics['data_rate']:.2f} bytes/sec"
                 
-                if file_results.get('failed_files', 0) > 0:
-                    f.write("### Failed Files\n\n")
-                    for file_detail in file_results.get('file_details', []):
-                        if file_detail.get('status') == 'failed':
-                            f.write(f"- {file_detail.get('original_path')}\n")
-                            f.write(f"  - Original hash: {file_detail.get('original_hash')}\n")
-                            f.write(f"  - Reconstructed hash: {file_detail.get('reconstructed_hash')}\n\n")
-            
-            # Block parsing results
-            f.write("## Block Parsing Results\n\n")
-            block_results = all_results.get('block_parsing', {})
-            if block_results:
-                f.write(f"Total modules: {block_results.get('total_modules', 0)}\n")
-                f.write(f"Modules with metadata: {block_results.get('modules_with_metadata', 0)}\n")
-                f.write(f"Modules with parameters: {block_results.get('modules_with_parameters', 0)}\n")
-                f.write(f"Total metadata entries: {block_results.get('total_metadata', 0)}\n")
-                f.write(f"Total parameters: {block_results.get('total_parameters', 0)}\n\n")
+                w(f"| {op_name} | {count} | {duration:.2f} | {rate} |\n")
             
-            # XML and LK module results
-            f.write("## XML and LK Module Results\n\n")
-            xml_lk_results = all_results.get('xml_lk_test', {})
-            if xml_lk_results:
-                f.write(f"XML modules found: {xml_lk_results.get('xml_modules', 0)}\n")
-                f.write(f"XML modules with content: {xml_lk_results.get('xml_with_content', 0)}\n")
-                f.write(f"LK modules found: {xml_lk_results.get('lk_modules', 0)}\n")
-                f.write(f"LK modules with content: {xml_lk_results.get('lk_with_content', 0)}\n\n")
+            w("\n")
+        
+        # Database details
+        w("## Database Statistics\n\n")
+        db_stats = all_results.get('database_integrity', {}).get('tables', {})
+        if db_stats:
+            w("| Table Name | Count |\n")
+            w("|------------|-------|\n")
             
-            # Errors and warnings
-            all_errors = []
-            for test_name, test_results in all_results.items():
-                if isinstance(test_results, dict) and 'errors' in test_results:
-                    for error in test_results['errors']:
-                        all_errors.append(f"{test_name}: {error}")
+            w("".join(map(_TABLE_ROW, db_stats.keys(), db_stats.values())))
             
-            if all_errors:
-                f.write("## Errors and Warnings\n\n")
-                for error in all_errors:
-                    f.write(f"- {error}\n")
+            w("\n")
+        
+        # File verification results
+        w("## File Reconstruction Results\n\n")
+        file_results = all_results.get('file_verification', {})
+        if file_results:
+            w(f"Total files: {file_results.get('total_files', 0)}\n")
+            w(f"Verified files: {file_results.get('verified_files', 0)}\n")
+            w(f"Failed files: {file_results.get('failed_files', 0)}\n")
+            w(f"Missing files: {file_results.get('missing_files', 0)}\n\n")
             
-            logger.info(f"Detailed report generated at {output_file}")
+            if file_results.get('failed_files', 0) > 0:
+                w("### Failed Files\n\n")
+                w("".join([
+                    _FAILED_FILE_ENTRY(fd['original_path'], fd.get('original_hash'),
+                                       fd.get('reconstructed_hash'))
+                    for fd in iter_failed_files(file_results)
+                ]))
+        
+        # Block parsing results
+        w("## Block Parsing Results\n\n")
+        block_results = all_results.get('block_parsing', {})
+        if block_results:
+            w(f"Total modules: {block_results.get('total_modules', 0)}\n")
+            w(f"Modules with metadata: {block_results.get('modules_with_metadata', 0)}\n")
+            w(f"Modules with parameters: {block_results.get('modules_with_parameters', 0)}\n")
+            w(f"Total metadata entries: {block_results.get('total_metadata', 0)}\n")
+            w(f"Total parameters: {block_results.get('total_parameters', 0)}\n\n")
+        
+        # XML and LK module results
+        w("## XML and LK Module Results\n\n")
+        xml_lk_results = all_results.get('xml_lk_test', {})
+        if xml_lk_results:
+            w(f"XML modules found: {xml_lk_results.get('xml_modules', 0)}\n")
+            w(f"XML modules with content: {xml_lk_results.get('xml_with_content', 0)}\n")
+            w(f"LK modules found: {xml_lk_results.get('lk_modules', 0)}\n")
+            w(f"LK modules with content: {xml_lk_results.get('lk_with_content', 0)}\n\n")
+        
+        # Errors and warnings
+        all_errors = []
+        for test_name, test_results in all_results.items():
+            if isinstance(test_results, dict) and 'errors' in test_results:
+                for error in test_results['errors']:
+                    all_errors.append(f"{test_name}: {error}")
+        
+        if all_errors:
+            w("## Errors and Warnings\n\n")
+            for error in all_errors:
+                w(f"- {error}\n")
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+        
+        logger.info(f"Detailed report generated at {output_file}")
             
     except Exception as e:
         logger.error(f"Failed to generate detailed report: {e}")
@@ -393,12 +337,9 @@ def run_full_api_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
             "duration": scan_duration
         }
         
-        # Step 2: Database integrity test
-        logger.info("Step 2: Testing database integrity")
-        all_results["database_integrity"] = test_database_integrity(api_test.db_path)
-        
-        # Step 3: Reconstruct files
-        logger.info("Step 3: Reconstructing files")
+        # Step 2: Reconstruct files. This runs before the integrity check so
+        # nothing writes to the database while the check has it open immutable
+        logger.info("Step 2: Reconstructing files")
         reconstruct_dir = os.path.join(output_dir, "reconstructed")
         success_count, failure_count, recon_duration = api_test.reconstruct_files(reconstruct_dir)
         all_results["reconstruction"] = {
@@ -407,17 +348,47 @@ def run_full_api_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
             "duration": recon_duration
         }
         
-        # Step 4: Verify file reconstruction
-        logger.info("Step 4: Verifying reconstructed files")
-        all_results["file_verification"] = verify_files(input_dir, reconstruct_dir)
-        
-        # Step 5: Test block parsing
-        logger.info("Step 5: Testing block parsing")
-        all_results["block_parsing"] = test_block_parsing(api_test)
-        
-        # Step 6: Test XML and LK modules specifically
-        logger.info("Step 6: Testing XML and LK modules")
-        all_results["xml_lk_test"] = test_xml_and_lk_modules(api_test)
+        # The database integrity check and file verification only read the
+        # database and files, so they run on worker threads while the steps
+        # using the API test framework continue on this thread
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Step 3: Database integrity test
+            logger.info("Step 3: Testing database integrity")
+            integrity_future = executor.submit(test_database_integrity, api_test.db_path)
+            
+            # Step 4: Verify file reconstruction
+            logger.info("Step 4: Verifying reconstructed files")
+            verify_future = executor.submit(
+                verify_files, input_dir, reconstruct_dir,
+                details_file=os.path.join(output_dir, "file_verification.jsonl")
+            )
+            
+            # Steps 5 and 6 share a single listing of all modules
+            modules_error = None
+            try:
+                modules, _ = api_test.get_all_modules()
+            except Exception as e:
+                modules_error = str(e)
+                logger.error(f"Failed to get modules: {e}")
+            
+            # Step 5: Test block parsing
+            logger.info("Step 5: Testing block parsing")
+            if modules_error is None:
+                block_parsing = test_block_parsing(modules)
+            else:
+                block_parsing = {"success": False, "error": modules_error}
+            
+            # Step 6: Test XML and LK modules specifically
+            logger.info("Step 6: Testing XML and LK modules")
+            if modules_error is None:
+                xml_lk_test = test_xml_and_lk_modules(modules)
+            else:
+                xml_lk_test = {"success": False, "error": modules_error}
+            
+            all_results["database_integrity"] = integrity_future.result()
+            all_results["file_verification"] = verify_future.result()
+            all_results["block_parsing"] = block_parsing
+            all_results["xml_lk_test"] = xml_lk_test
         
         # Save performance metrics
         metrics_file = os.path.join(output_dir, "api_performance_metrics.json")
@@ -440,8 +411,7 @@ def run_full_api_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
         
         # Save full results
         results_file = os.path.join(output_dir, "full_api_test_results.json")
-        with open(results_file, 'w') as f:
-            json.dump(all_results, f, indent=2)
+        write_json(results_file, all_results)
         
         logger.info(f"Full API test completed successfully, results saved to {results_file}")
         logger.info(f"Detailed report available at {DETAILED_REPORT}")
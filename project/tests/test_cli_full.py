@@ -7,14 +7,21 @@ It tests all aspects of the CLI including scanning, querying, and file reconstru
 """
 
 import os
+import io
+import re
 import sys
 import time
-import json
 import logging
 import argparse
-import hashlib
+import shlex
 import subprocess
 import sqlite3
+import contextlib
+import importlib
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
@@ -40,85 +47,68 @@ except ImportError as e:
     logger.error(f"Failed to import CLI test framework: {e}")
     sys.exit(1)
 
+from project.tests.common import HASH_WORKERS, iter_failed_files, quote_ident, verify_files, write_json
+
 # Default test directory - update as needed
 DEFAULT_TEST_DIR = os.path.join(root_dir, "tests", "test_data")
 # Output directory for test results
 OUTPUT_DIR = os.path.join(project_dir, "test_results", "cli")
 # Detailed report file
 DETAILED_REPORT = os.path.join(OUTPUT_DIR, "CLI_DETAILED_TEST_REPORT.md")
-
-def calculate_file_hash(file_path: str) -> Optional[str]:
-    """Calculate SHA-256 hash of a file."""
-    try:
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
-    except Exception as e:
-        logger.error(f"Error calculating hash for {file_path}: {e}")
-        return None
-
-def verify_files(source_dir: str, reconstructed_dir: str) -> Dict[str, Any]:
-    """
-    Verify reconstructed files match the originals.
-    
-    Args:
-        source_dir: Original source directory
-        reconstructed_dir: Directory with reconstructed files
-        
-    Returns:
-        Dictionary with verification results
-    """
-    logger.info(f"Verifying reconstructed files against originals in {source_dir}")
-    results = {
-        "total_files": 0,
-        "verified_files": 0,
-        "failed_files": 0,
-        "missing_files": 0,
-        "file_details": []
+# Connection tuning applied before the integrity check's full-table reads
+INTEGRITY_PRAGMAS = """
+PRAGMA mmap_size = 268435456;
+PRAGMA cache_size = -16384;
+PRAGMA temp_store = MEMORY;
+"""
+# Command line variants checked by test_cli_command_syntax
+COMMAND_TESTS = [
+    {
+        "name": "help command",
+        "cmd": [sys.executable, "-m", "modmeta.cli", "--help"],
+        "expected_return_code": 0,
+        "expected_output_contains": ["usage", "commands"],
+        "in_process": True,
+    },
+    {
+        "name": "scan help",
+        "cmd": [sys.executable, "-m", "modmeta.cli", "scan", "--help"],
+        "expected_return_code": 0,
+        "expected_output_contains": ["--recursive", "--with-raw"],
+        "in_process": True,
+    },
+    {
+        "name": "list help",
+        "cmd": [sys.executable, "-m", "modmeta.cli", "list", "--help"],
+        "expected_return_code": 0,
+        "expected_output_contains": ["--db", "--json"],
+        "in_process": True,
+    },
+    {
+        "name": "invalid command",
+        "cmd": [sys.executable, "-m", "modmeta.cli", "invalid_command"],
+        "expected_return_code": 2,
+        "expected_output_contains": ["error", "usage"],
+        "in_process": True,
+    },
+    {
+        "name": "invalid arguments",
+        "cmd": [sys.executable, "-m", "modmeta.cli", "scan", "--invalid-arg"],
+        "expected_return_code": 2,
+        "expected_output_contains": ["error", "scan"],
+        "in_process": True,
     }
-    
-    # Get original files
-    original_files = {}
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, source_dir)
-            original_files[rel_path] = file_path
-    
-    results["total_files"] = len(original_files)
-    
-    # Check reconstructed files
-    for rel_path, orig_path in original_files.items():
-        recon_path = os.path.join(reconstructed_dir, os.path.basename(orig_path))
-        
-        file_result = {
-            "original_path": orig_path,
-            "reconstructed_path": recon_path,
-            "status": "missing"
-        }
-        
-        if os.path.exists(recon_path):
-            orig_hash = calculate_file_hash(orig_path)
-            recon_hash = calculate_file_hash(recon_path)
-            
-            if orig_hash and recon_hash and orig_hash == recon_hash:
-                file_result["status"] = "verified"
-                results["verified_files"] += 1
-            else:
-                file_result["status"] = "failed"
-                file_result["original_hash"] = orig_hash
-                file_result["reconstructed_hash"] = recon_hash
-                results["failed_files"] += 1
-        else:
-            results["missing_files"] += 1
-        
-        results["file_details"].append(file_result)
-    
-    logger.info(f"File verification: {results['verified_files']} verified, "
-                f"{results['failed_files']} failed, {results['missing_files']} missing")
-    return results
+]
+# subprocess only uses the cheaper posix_spawn when fds needn't be closed in the
+# child; Python creates fds non-inheritable, so nothing extra leaks to the CLI
+SPAWN_OPTIONS = {"close_fds": False}
+# Tables counted per UNION ALL statement (SQLite caps compound SELECTs at 500 terms)
+COUNT_BATCH_SIZE = 200
+# Output lines mentioning .xml, and lines mentioning .lk but not .xml
+_XML_LINE = re.compile(r"^.*?\.xml", re.IGNORECASE | re.MULTILINE)
+_LK_LINE = re.compile(r"^(?!.*\.xml).*?\.lk", re.IGNORECASE | re.MULTILINE)
+# Serializes in-process CLI runs, which redirect the process-wide stdio
+_inproc_cli_lock = threading.Lock()
 
 def test_database_integrity(db_path: str) -> Dict[str, Any]:
     """
@@ -138,27 +128,32 @@ def test_database_integrity(db_path: str) -> Dict[str, Any]:
     }
     
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Check foreign key integrity
-        cursor.execute("PRAGMA foreign_key_check")
-        fk_violations = cursor.fetchall()
-        if fk_violations:
-            results["foreign_keys"] = False
-            results["errors"].append(f"Foreign key violations found: {fk_violations}")
-        
-        # Get all tables and their row counts
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            results["tables"][table_name] = count
-        
-        conn.close()
+        with contextlib.closing(sqlite3.connect(db_path)) as conn:
+            cursor = conn.cursor()
+            cursor.executescript(INTEGRITY_PRAGMAS)
+            
+            # Check foreign key integrity
+            cursor.execute("PRAGMA foreign_key_check")
+            fk_violations = cursor.fetchall()
+            if fk_violations:
+                results["foreign_keys"] = False
+                results["errors"].append(f"Foreign key violations found: {fk_violations}")
+            
+            # Get all tables and their row counts, counting a batch of tables per query
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            table_names = [row[0] for row in cursor.fetchall()]
+            
+            for i in range(0, len(table_names), COUNT_BATCH_SIZE):
+                batch = table_names[i:i + COUNT_BATCH_SIZE]
+                cursor.execute(
+                    " UNION ALL ".join(f"SELECT ?, COUNT(*) FROM {quote_ident(table)}" for table in batch),
+                    batch
+                )
+                results["tables"].update(cursor.fetchall())
+            
+            # Let SQLite refresh statistics it would benefit from
+            cursor.execute("PRAGMA optimize")
+        
         results["success"] = True
         logger.info(f"Database integrity check completed successfully")
         
@@ -168,6 +163,72 @@ def test_database_integrity(db_path: str) -> Dict[str, Any]:
     
     return results
 
+@lru_cache(maxsize=None)
+def _load_cli_module():
+    """
+    Import modmeta.cli once for in-process runs.
+    
+    Returns None, so callers use subprocesses, if the module can't be imported
+    or has no callable main().
+    """
+    try:
+        cli_module = importlib.import_module("modmeta.cli")
+    except Exception as e:
+        logger.warning(f"modmeta.cli not importable in-process, using subprocesses: {e}")
+        return None
+    if not callable(getattr(cli_module, "main", None)):
+        logger.warning("modmeta.cli has no callable main(), using subprocesses")
+        return None
+    return cli_module
+
+def _invoke_cli_inproc(cli_module, args: List[str]) -> subprocess.CompletedProcess:
+    """
+    Run modmeta.cli's main() in this process as if invoked with args.
+    
+    Only suitable for commands that stop during argument parsing (help and
+    invalid arguments). Output is captured, SystemExit becomes the return
+    code, and any other exception is reported on stderr with return code 1,
+    as the interpreter would. Callers must hold _inproc_cli_lock, since stdio
+    and sys.argv are process-wide.
+    
+    Args:
+        cli_module: The imported modmeta.cli module
+        args: Command line arguments after "python -m modmeta.cli"
+        
+    Returns:
+        CompletedProcess mirroring what subprocess.run would have returned
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    saved_argv = sys.argv
+    sys.argv = [cli_module.__file__] + list(args)
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                code = cli_module.main()
+            except SystemExit as e:
+                code = e.code
+            except Exception:
+                traceback.print_exc()
+                code = 1
+            # Mirror the interpreter's handling of a non-integer exit code
+            if code is not None and not isinstance(code, int):
+                print(code, file=sys.stderr)
+                code = 1
+    finally:
+        sys.argv = saved_argv
+    return subprocess.CompletedProcess(args, code or 0, stdout.getvalue(), stderr.getvalue())
+
+def _run_subprocess_test(test: Dict[str, Any]) -> subprocess.CompletedProcess:
+    """Run one command syntax test's command in a subprocess, capturing its output."""
+    logger.info(f"Testing CLI command: {test['name']}")
+    return subprocess.run(
+        test["cmd"],
+        capture_output=True,
+        text=True,
+        check=False,
+        **SPAWN_OPTIONS
+    )
+
 def test_cli_command_syntax() -> Dict[str, Any]:
     """
     Test various CLI command syntax combinations to ensure robustness.
@@ -182,86 +243,64 @@ def test_cli_command_syntax() -> Dict[str, Any]:
         "details": []
     }
     
-    # Test command variants
-    command_tests = [
-        {
-            "name": "help command",
-            "cmd": [sys.executable, "-m", "modmeta.cli", "--help"],
-            "expected_return_code": 0,
-            "expected_output_contains": ["usage", "commands"],
-        },
-        {
-            "name": "scan help",
-            "cmd": [sys.executable, "-m", "modmeta.cli", "scan", "--help"],
-            "expected_return_code": 0,
-            "expected_output_contains": ["--recursive", "--with-raw"],
-        },
-        {
-            "name": "list help",
-            "cmd": [sys.executable, "-m", "modmeta.cli", "list", "--help"],
-            "expected_return_code": 0,
-            "expected_output_contains": ["--db", "--json"],
-        },
-        {
-            "name": "invalid command",
-            "cmd": [sys.executable, "-m", "modmeta.cli", "invalid_command"],
-            "expected_return_code": 2,
-            "expected_output_contains": ["error", "usage"],
-        },
-        {
-            "name": "invalid arguments",
-            "cmd": [sys.executable, "-m", "modmeta.cli", "scan", "--invalid-arg"],
-            "expected_return_code": 2,
-            "expected_output_contains": ["error", "scan"],
-        }
-    ]
+    # Argument-parsing tests run in this process when modmeta.cli can be imported
+    cli_module = None
+    if any(test.get("in_process") for test in COMMAND_TESTS):
+        cli_module = _load_cli_module()
+    spawned = [i for i, test in enumerate(COMMAND_TESTS)
+               if not (test.get("in_process") and cli_module is not None)]
     
-    for test in command_tests:
-        results["commands_tested"] += 1
-        
-        logger.info(f"Testing CLI command: {test['name']}")
-        try:
-            process = subprocess.run(
-                test["cmd"],
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            
-            # Combine stdout and stderr for easier checking
-            output = process.stdout + process.stderr
-            
-            # Check return code
-            return_code_match = process.returncode == test["expected_return_code"]
-            
-            # Check for expected output
-            output_match = all(text.lower() in output.lower() for text in test["expected_output_contains"])
-            
-            test_result = {
-                "name": test["name"],
-                "command": " ".join(test["cmd"]),
-                "return_code": process.returncode,
-                "return_code_match": return_code_match,
-                "output_match": output_match,
-                "success": return_code_match and output_match
-            }
+    # Start the subprocess tests at once on worker threads; the in-process tests
+    # run one at a time on this thread meanwhile
+    with ThreadPoolExecutor(max_workers=max(1, len(spawned))) as executor:
+        futures = {i: executor.submit(_run_subprocess_test, COMMAND_TESTS[i]) for i in spawned}
+        
+        for i, test in enumerate(COMMAND_TESTS):
+            results["commands_tested"] += 1
+            command = shlex.join(test["cmd"])
             
-            if test_result["success"]:
-                results["commands_succeeded"] += 1
-            else:
+            try:
+                if i in futures:
+                    process = futures[i].result()
+                else:
+                    logger.info(f"Testing CLI command: {test['name']}")
+                    with _inproc_cli_lock:
+                        process = _invoke_cli_inproc(cli_module, test["cmd"][3:])
+                
+                # Combine stdout and stderr for easier checking
+                output = process.stdout + process.stderr
+                
+                # Check return code
+                return_code_match = process.returncode == test["expected_return_code"]
+                
+                # Check for expected output
+                output_match = all(text.lower() in output.lower() for text in test["expected_output_contains"])
+                
+                test_result = {
+                    "name": test["name"],
+                    "command": command,
+                    "return_code": process.returncode,
+                    "return_code_match": return_code_match,
+                    "output_match": output_match,
+                    "success": return_code_match and output_match
+                }
+                
+                if test_result["success"]:
+                    results["commands_succeeded"] += 1
+                else:
+                    results["commands_failed"] += 1
+                
+                results["details"].append(test_result)
+                
+            except Exception as e:
+                logger.error(f"Error testing command {test['name']}: {e}")
                 results["commands_failed"] += 1
-            
-            results["details"].append(test_result)
-            
-        except Exception as e:
-            logger.error(f"Error testing command {test['name']}: {e}")
-            results["commands_failed"] += 1
-            results["details"].append({
-                "name": test["name"],
-                "command": " ".join(test["cmd"]),
-                "error": str(e),
-                "success": False
-            })
+                results["details"].append({
+                    "name": test["name"],
+                    "command": command,
+                    "error": str(e),
+                    "success": False
+                })
     
     logger.info(f"Command syntax tests: {results['commands_succeeded']} succeeded, "
                 f"{results['commands_failed']} failed")
@@ -300,12 +339,9 @@ def test_cli_xml_and_lk_modules(cli_test: MODMetaCLITest) -> Dict[str, Any]:
             results["error"] = f"Command failed with return code {returncode}: {stderr}"
             return results
         
-        # Count XML and LK files from output
-        for line in stdout.splitlines():
-            if ".xml" in line.lower():
-                results["xml_modules"] += 1
-            elif ".lk" in line.lower():
-                results["lk_modules"] += 1
+        # Count XML and LK files from output, one regex pass over it each
+        results["xml_modules"] = len(_XML_LINE.findall(stdout))
+        results["lk_modules"] = len(_LK_LINE.findall(stdout))
         
         results["total_found"] = results["xml_modules"] + results["lk_modules"]
         results["success"] = True
@@ -360,12 +396,13 @@ def test_cli_filtering_commands(cli_test: MODMetaCLITest) -> Dict[str, Any]:
     ]
     
     for test in filter_tests:
+        command = shlex.join(test["cmd"])
         try:
             returncode, stdout, stderr, duration = cli_test._run_command(test["cmd"], f"filter_{test['name']}")
             
             test_result = {
                 "name": test["name"],
-                "command": " ".join(test["cmd"]),
+                "command": command,
                 "return_code": returncode,
                 "duration": duration,
                 "success": returncode == 0,
@@ -382,7 +419,7 @@ def test_cli_filtering_commands(cli_test: MODMetaCLITest) -> Dict[str, Any]:
             logger.error(f"Error in filter test {test['name']}: {e}")
             results["filter_tests"].append({
                 "name": test["name"],
-                "command": " ".join(test["cmd"]),
+                "command": command,
                 "error": str(e),
                 "success": False
             })
@@ -394,6 +431,10 @@ def test_cli_filtering_commands(cli_test: MODMetaCLITest) -> Dict[str, Any]:
                 f"{sum(1 for t in results['filter_tests'] if not t['success'])} failed")
     return results
 
+# Row templates for the detailed report
+_TABLE_ROW = "| {} | {} |\n".format
+_FAILED_FILE_ENTRY = "- {}\n  - Original hash: {}\n  - Reconstructed hash: {}\n\n".format
+
 def generate_detailed_report(all_results: Dict[str, Any], output_file: str) -> None:
     """
     Generate a detailed Markdown report of all test results.
@@ -403,168 +444,211 @@ def generate_detailed_report(all_results: Dict[str, Any], output_file: str) -> N
         output_file: Output file path
     """
     try:
-        with open(output_file, 'w') as f:
-            f.write("# Detailed CLI Test Report\n\n")
-            f.write(f"Test performed on: {datetime.now().strftime('%Y-%m-%d')}\n\n")
-            
-            # Test directory
-            f.write(f"Test directory: {all_results.get('input_dir', 'Unknown')}\n\n")
-            
-            # Command Execution Details
-            f.write("## Command Execution Details\n\n")
-            for step_name, step_data in all_results.items():
-                if step_name.startswith("step_") and isinstance(step_data, dict) and "command" in step_data:
-                    cmd = step_data.get("command", "")
-                    status = "Completed successfully" if step_data.get("success", False) else "Failed"
-                    returncode = step_data.get("returncode", "Unknown")
-                    
-                    f.write(f"### {step_data.get('description', step_name)}\n\n")
-                    f.write("```\n")
-                    f.write(cmd + "\n")
-                    f.write("```\n\n")
-                    
-                    f.write(f"**Status**: {status} (returncode: {returncode})\n\n")
-                    
-                    if "stdout" in step_data and step_data["stdout"]:
-                        f.write("**Stdout**:\n")
-                        f.write("```\n")
-                        f.write(step_data["stdout"][:1000])  # Limit to first 1000 chars
-                        if len(step_data["stdout"]) > 1000:
-                            f.write("\n... (output truncated) ...")
-                        f.write("\n```\n\n")
-                    
-                    if "stderr" in step_data and step_data["stderr"]:
-                        f.write("**Stderr**:\n")
-                        f.write("```\n")
-                        f.write(step_data["stderr"][:1000])  # Limit to first 1000 chars
-                        if len(step_data["stderr"]) > 1000:
-                            f.write("\n... (output truncated) ...")
-                        f.write("\n```\n\n")
-            
-            # Performance Summary
-            f.write("## Performance Summary\n\n")
-            perf = all_results.get('performance', {}).get('metrics', {})
-            if perf:
-                f.write(f"Total test duration: {perf.get('total_duration', 0):.2f} seconds\n\n")
+        parts = []
+        w = parts.append
+        
+        w("# Detailed CLI Test Report\n\n")
+        w(f"Test performed on: {datetime.now().strftime('%Y-%m-%d')}\n\n")
+        
+        # Test directory
+        w(f"Test directory: {all_results.get('input_dir', 'Unknown')}\n\n")
+        
+        # Command Execution Details
+        w("## Command Execution Details\n\n")
+        for step_name, step_data in all_results.items():
+            if step_name.startswith("step_") and isinstance(step_data, dict) and "command" in step_data:
+                cmd = step_data.get("command", "")
+                status = "Completed successfully" if step_data.get("success", False) else "Failed"
+                returncode = step_data.get("returncode", "Unknown")
                 
-                f.write("| Operation | Count | Duration (s) | Rate |\n")
-                f.write("|-----------|-------|-------------|------|\n")
+                w(f"### {step_data.get('description', step_name)}\n\n")
+                w(f"```\n{cmd}\n```\n\n")
                 
-                for op_name, op_metrics in perf.get('operations', {}).items():
-                    count = op_metrics.get('count', 0)
-                    duration = op_metrics.get('total_duration', 0)
-                    rate = ""
-                    if 'data_rate' in op_metrics and op_metrics['data_rate'] > 0:
-                        rate = f"{op_metrics['data_rate']:.2f} bytes/sec"
-                    
-                    f.write(f"| {op_name} | {count} | {duration:.2f} | {rate} |\n")
+                w(f"**Status**: {status} (returncode: {returncode})\n\n")
                 
-                f.write("\n")
+                for label, key in (("Stdout", "stdout"), ("Stderr", "stderr")):
+                    output = step_data.get(key)
+                    if output:
+                        w(f"**{label}**:\n```\n")
+                        w(output[:1000])  # Limit to first 1000 chars
+                        if len(output) > 1000:
+                            w("\n... (output truncated) ...")
+                        w("\n```\n\n")
+        
+        # Performance Summary
+        w("## Performance Summary\n\n")
+        perf = all_results.get('performance', {}).get('metrics', {})
+        if perf:
+            w(f"Total test duration: {perf.get('total_duration', 0):.2f} seconds\n\n")
             
-            # Database details
-            f.write("## Database Statistics\n\n")
-            db_stats = all_results.get('database_integrity', {}).get('tables', {})
-            if db_stats:
-                f.write("| Table Name | Count |\n")
-                f.write("|------------|-------|\n")
-                
-                for table, count in db_stats.items():
-                    f.write(f"| {table} | {count} |\n")
-                
-                f.write("\n")
+            w("| Operation | Count | Duration (s) | Rate |\n")
+            w("|-----------|-------|-------------|------|\n")
             
-            # File verification results
-            f.write("## File Reconstruction Results\n\n")
-            file_results = all_results.get('file_verification', {})
-            if file_results:
-                f.write(f"Total files: {file_results.get('total_files', 0)}\n")
-                f.write(f"Verified files: {file_results.get('verified_files', 0)}\n")
-                f.write(f"Failed files: {file_results.get('failed_files', 0)}\n")
-                f.write(f"Missing files: {file_results.get('missing_files', 0)}\n\n")
+            for op_name, op_metrics in perf.get('operations', {}).items():
+                count = op_metrics.get('count', 0)
+                duration = op_metrics.get('total_duration', 0)
+                rate = ""
+                if 'data_rate' in op_metrics and op_metrics['data_rate'] > 0:
+                    rate = f"{op_metrics['data_rate']:.2f} bytes/sec"
                 
-                if file_results.get('failed_files', 0) > 0:
-                    f.write("### Failed Files\n\n")
-                    for file_detail in file_results.get('file_details', []):
-                        if file_detail.get('status') == 'failed':
-                            f.write(f"- {file_detail.get('original_path')}\n")
-                            f.write(f"  - Original hash: {file_detail.get('original_hash')}\n")
-                            f.write(f"  - Reconstructed hash: {file_detail.get('reconstructed_hash')}\n\n")
+                w(f"| {op_name} | {count} | {duration:.2f} | {rate} |\n")
             
-            # Command syntax test results
-            f.write("## Command Syntax Test Results\n\n")
-            cmd_syntax = all_results.get('command_syntax', {})
-            if cmd_syntax:
-                f.write(f"Commands tested: {cmd_syntax.get('commands_tested', 0)}\n")
-                f.write(f"Commands succeeded: {cmd_syntax.get('commands_succeeded', 0)}\n")
-                f.write(f"Commands failed: {cmd_syntax.get('commands_failed', 0)}\n\n")
-                
-                if 'details' in cmd_syntax and cmd_syntax['details']:
-                    f.write("| Command | Return Code | Success |\n")
-                    f.write("|---------|-------------|--------|\n")
-                    
-                    for detail in cmd_syntax['details']:
-                        cmd = detail.get('command', '')
-                        if len(cmd) > 50:
-                            cmd = cmd[:47] + "..."
-                        
-                        f.write(f"| {cmd} | {detail.get('return_code', 'N/A')} | {detail.get('success', False)} |\n")
-                
-                f.write("\n")
+            w("\n")
+        
+        # Database details
+        w("## Database Statistics\n\n")
+        db_stats = all_results.get('database_integrity', {}).get('tables', {})
+        if db_stats:
+            w("| Table Name | Count |\n")
+            w("|------------|-------|\n")
+            
+            w("".join(map(_TABLE_ROW, db_stats.keys(), db_stats.values())))
             
-            # XML and LK module results
-            f.write("## XML and LK Module Results\n\n")
-            xml_lk_results = all_results.get('xml_lk_test', {})
-            if xml_lk_results:
-                f.write(f"XML modules found: {xml_lk_results.get('xml_modules', 0)}\n")
-                f.write(f"LK modules found: {xml_lk_results.get('lk_modules', 0)}\n")
-                f.write(f"Total special modules: {xml_lk_results.get('total_found', 0)}\n\n")
+            w("\n")
+        
+        # File verification results
+        w("## File Reconstruction Results\n\n")
+        file_results = all_results.get('file_verification', {})
+        if file_results:
+            w(f"Total files: {file_results.get('total_files', 0)}\n")
+            w(f"Verified files: {file_results.get('verified_files', 0)}\n")
+            w(f"Failed files: {file_results.get('failed_files', 0)}\n")
+            w(f"Missing files: {file_results.get('missing_files', 0)}\n\n")
             
-            # Filter command test results
-            f.write("## Filter Command Test Results\n\n")
-            filter_results = all_results.get('filter_commands', {})
-            if filter_results and 'filter_tests' in filter_results:
-                f.write("| Filter Test | Success | Duration (s) | Output Lines |\n")
-                f.write("|------------|---------|--------------|-------------|\n")
+            if file_results.get('failed_files', 0) > 0:
+                w("### Failed Files\n\n")
+                w("".join([
+                    _FAILED_FILE_ENTRY(fd.get('original_path'), fd.get('original_hash'),
+                                       fd.get('reconstructed_hash'))
+                    for fd in iter_failed_files(file_results)
+                ]))
+        
+        # Command syntax test results
+        w("## Command Syntax Test Results\n\n")
+        cmd_syntax = all_results.get('command_syntax', {})
+        if cmd_syntax:
+            w(f"Commands tested: {cmd_syntax.get('commands_tested', 0)}\n")
+            w(f"Commands succeeded: {cmd_syntax.get('commands_succeeded', 0)}\n")
+            w(f"Commands failed: {cmd_syntax.get('commands_failed', 0)}\n\n")
+            
+            if 'details' in cmd_syntax and cmd_syntax['details']:
+                w("| Command | Return Code | Success |\n")
+                w("|---------|-------------|--------|\n")
                 
-                for test in filter_results['filter_tests']:
-                    name = test.get('name', 'Unknown')
-                    success = test.get('success', False)
-                    duration = test.get('duration', 0)
-                    output_lines = test.get('output_lines', 0)
+                for detail in cmd_syntax['details']:
+                    cmd = detail.get('command', '')
+                    if len(cmd) > 50:
+                        cmd = cmd[:47] + "..."
                     
-                    f.write(f"| {name} | {success} | {duration:.2f} | {output_lines} |\n")
-                
-                f.write("\n")
+                    w(f"| {cmd} | {detail.get('return_code', 'N/A')} | {detail.get('success', False)} |\n")
             
-            # Error Analysis section
-            errors = []
-            for test_name, test_results in all_results.items():
-                if isinstance(test_results, dict):
-                    if 'error' in test_results:
-                        errors.append(f"{test_name}: {test_results['error']}")
-                    elif 'errors' in test_results and isinstance(test_results['errors'], list):
-                        for error in test_results['errors']:
-                            errors.append(f"{test_name}: {error}")
+            w("\n")
+        
+        # XML and LK module results
+        w("## XML and LK Module Results\n\n")
+        xml_lk_results = all_results.get('xml_lk_test', {})
+        if xml_lk_results:
+            w(f"XML modules found: {xml_lk_results.get('xml_modules', 0)}\n")
+            w(f"LK modules found: {xml_lk_results.get('lk_modules', 0)}\n")
+            w(f"Total special modules: {xml_lk_results.get('total_found', 0)}\n\n")
+        
+        # Filter command test results
+        w("## Filter Command Test Results\n\n")
+        filter_results = all_results.get('filter_commands', {})
+        if filter_results and 'filter_tests' in filter_results:
+            w("| Filter Test | Success | Duration (s) | Output Lines |\n")
+            w("|------------|---------|--------------|-------------|\n")
             
-            if errors:
-                f.write("## Error Analysis\n\n")
-                for i, error in enumerate(errors, 1):
-                    f.write(f"{i}. **{error.split(':', 1)[0]}**:\n")
-                    error_details = error.split(':', 1)[1] if ':' in error else error
-                    f.write(f"   - {error_details.strip()}\n\n")
-            
-            logger.info(f"Detailed report generated at {output_file}")
+            for test in filter_results['filter_tests']:
+                name = test.get('name', 'Unknown')
+                success = test.get('success', False)
+                duration = test.get('duration', 0)
+                output_lines = test.get('output_lines', 0)
+                
+                w(f"| {name} | {success} | {duration:.2f} | {output_lines} |\n")
             
+            w("\n")
+        
+        # Error Analysis section
+        errors = []
+        for test_name, test_results in all_results.items():
+            if isinstance(test_results, dict):
+                if 'error' in test_results:
+                    errors.append(f"{test_name}: {test_results['error']}")
+                elif 'errors' in test_results and isinstance(test_results['errors'], list):
+                    for error in test_results['errors']:
+                        errors.append(f"{test_name}: {error}")
+        
+        if errors:
+            w("## Error Analysis\n\n")
+            for i, error in enumerate(errors, 1):
+                w(f"{i}. **{error.split(':', 1)[0]}**:\n")
+                error_details = error.split(':', 1)[1] if ':' in error else error
+                w(f"   - {error_details.strip()}\n\n")
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+        
+        logger.info(f"Detailed report generated at {output_file}")
+        
     except Exception as e:
         logger.error(f"Failed to generate detailed report: {e}")
 
-def run_full_cli_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str, Any]:
+class _RecordingCLITest(MODMetaCLITest):
+    """MODMetaCLITest that keeps the outcome of every command it runs."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Command (as a tuple of strings) -> (returncode, stdout, stderr, duration)
+        self.command_outcomes = {}
+    
+    def _run_command(self, cmd, *args, **kwargs):
+        outcome = super()._run_command(cmd, *args, **kwargs)
+        self.command_outcomes[tuple(map(str, cmd))] = outcome
+        return outcome
+
+def _step_result(cli_test: _RecordingCLITest, description: str, cmd: List[str]) -> Dict[str, Any]:
+    """
+    Build the command details for a run_full_cli_test step.
+    
+    Reports exactly the command the step declares. Its recorded outcome is
+    reused when the framework already ran that command; otherwise the command
+    is run directly with subprocess, outside the framework, so the extra run
+    isn't counted in the performance metrics.
+    """
+    outcome = cli_test.command_outcomes.get(tuple(map(str, cmd)))
+    if outcome is None:
+        logger.warning(f"{description}: the framework didn't run {shlex.join(map(str, cmd))}, "
+                       f"running it directly for the report")
+        completed = subprocess.run(
+            [str(part) for part in cmd],
+            capture_output=True,
+            text=True,
+            check=False,
+            **SPAWN_OPTIONS
+        )
+        returncode, stdout, stderr = completed.returncode, completed.stdout, completed.stderr
+    else:
+        returncode, stdout, stderr, _ = outcome
+    
+    return {
+        "description": description,
+        "command": shlex.join(str(part) for part in cmd),
+        "returncode": returncode,
+        "stdout": stdout,
+        "stderr": stderr,
+        "success": returncode == 0
+    }
+
+def run_full_cli_test(input_dir: str, output_dir: str = OUTPUT_DIR,
+                      hash_workers: int = HASH_WORKERS) -> Dict[str, Any]:
     """
     Run a full test of the CLI functionality.
     
     Args:
         input_dir: Directory to scan
         output_dir: Directory for test output
+        hash_workers: Number of threads comparing files during verification
         
     Returns:
         Dictionary with all test results
@@ -580,13 +664,13 @@ def run_full_cli_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
     }
     
     try:
-        # Initialize CLI test framework
-        cli_test = MODMetaCLITest(output_dir=os.path.join(output_dir, "cli_output"))
-        
         # Step 1: Test CLI command syntax
         logger.info("Step 1: Testing CLI command syntax")
         all_results["command_syntax"] = test_cli_command_syntax()
         
+        # Initialize CLI test framework once the standalone commands have run
+        cli_test = _RecordingCLITest(output_dir=os.path.join(output_dir, "cli_output"))
+        
         # Step 2: Scan directory
         logger.info("Step 2: Scanning directory")
         module_count, scan_duration = cli_test.scan_directory(input_dir, recursive=True)
@@ -606,15 +690,7 @@ def run_full_cli_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
             "--verbose",
             "--recursive"
         ]
-        process = subprocess.run(cmd, capture_output=True, text=True)
-        all_results["step_scan"] = {
-            "description": "Scan Module Directory",
-            "command": " ".join(cmd),
-            "returncode": process.returncode,
-            "stdout": process.stdout,
-            "stderr": process.stderr,
-            "success": process.returncode == 0
-        }
+        all_results["step_scan"] = _step_result(cli_test, "Scan Module Directory", cmd)
         
         # Step 3: Database integrity test
         logger.info("Step 3: Testing database integrity")
@@ -635,15 +711,7 @@ def run_full_cli_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
             "list",
             "--db", cli_test.db_path
         ]
-        process = subprocess.run(cmd, capture_output=True, text=True)
-        all_results["step_list"] = {
-            "description": "List Modules",
-            "command": " ".join(cmd),
-            "returncode": process.returncode,
-            "stdout": process.stdout,
-            "stderr": process.stderr,
-            "success": process.returncode == 0
-        }
+        all_results["step_list"] = _step_result(cli_test, "List Modules", cmd)
         
         # Step 5: Reconstruct files
         logger.info("Step 5: Reconstructing files")
@@ -663,19 +731,11 @@ def run_full_cli_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
             "--output-dir", reconstruct_dir,
             "--all"
         ]
-        process = subprocess.run(cmd, capture_output=True, text=True)
-        all_results["step_reconstruct"] = {
-            "description": "Reconstruct Files",
-            "command": " ".join(cmd),
-            "returncode": process.returncode,
-            "stdout": process.stdout,
-            "stderr": process.stderr,
-            "success": process.returncode == 0
-        }
+        all_results["step_reconstruct"] = _step_result(cli_test, "Reconstruct Files", cmd)
         
         # Step 6: Verify file reconstruction
         logger.info("Step 6: Verifying reconstructed files")
-        all_results["file_verification"] = verify_files(input_dir, reconstruct_dir)
+        all_results["file_verification"] = verify_files(input_dir, reconstruct_dir, hash_workers)
         
         # Step 7: Test XML and LK modules specifically
         logger.info("Step 7: Testing XML and LK modules")
@@ -706,8 +766,7 @@ def run_full_cli_test(input_dir: str, output_dir: str = OUTPUT_DIR) -> Dict[str,
         
         # Save full results
         results_file = os.path.join(output_dir, "full_cli_test_results.json")
-        with open(results_file, 'w') as f:
-            json.dump(all_results, f, indent=2)
+        write_json(results_file, all_results)
         
         logger.info(f"Full CLI test completed successfully, results saved to {results_file}")
         logger.info(f"Detailed report available at {DETAILED_REPORT}")
@@ -726,9 +785,12 @@ def main():
                         help=f"Directory to scan (default: {DEFAULT_TEST_DIR})")
     parser.add_argument("--output-dir", default=OUTPUT_DIR,
                         help=f"Output directory for test results (default: {OUTPUT_DIR})")
+    parser.add_argument("--hash-workers", type=int, default=HASH_WORKERS,
+                        help=f"Threads comparing files during verification; use 1 on HDDs "
+                             f"(default: {HASH_WORKERS})")
     args = parser.parse_args()
     
-    run_full_cli_test(args.input_dir, args.output_dir)
+    run_full_cli_test(args.input_dir, args.output_dir, args.hash_workers)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
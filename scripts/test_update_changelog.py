@@ -0,0 +1,145 @@
+"""Tests for the parsed changelog model in update_changelog.py."""
+
+import datetime
+import os
+
+import pytest
+
+pytest.importorskip("semver")
+
+import update_changelog
+from update_changelog import parse_changelog
+
+REPO_CHANGELOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CHANGELOG.md")
+
+SAMPLE = """# Changelog
+
+Intro text.
+
+## [Unreleased]
+
+### Added
+- New thing
+
+### Fixed
+- A bug
+### Fixed
+- Repeated header kept in place
+
+## [1.0.0] - 2020-01-01
+### Added
+- First release
+
+## [not-a-version]
+- Loose line
+
+[unreleased]: https://example.com/compare/v1.0.0...HEAD
+[1.0.0]: https://example.com/releases/v1.0.0
+"""
+
+def _versions(changelog):
+    return [section.name for section in changelog.sections]
+
+def test_round_trip_is_lossless():
+    assert parse_changelog(SAMPLE).serialize() == SAMPLE
+
+def test_round_trip_adds_missing_final_newline():
+    assert parse_changelog("# Title\n## [Unreleased]").serialize() == "# Title\n## [Unreleased]\n"
+    assert parse_changelog("").serialize() == ""
+
+def test_round_trip_repo_changelog():
+    with open(REPO_CHANGELOG, encoding="utf-8") as f:
+        text = f.read()
+    expected = text if text.endswith("\n") else text + "\n"
+    assert parse_changelog(text).serialize() == expected
+
+def test_parse_splits_footer_and_repeated_categories():
+    changelog = parse_changelog(SAMPLE)
+    assert changelog.footer == [
+        "[unreleased]: https://example.com/compare/v1.0.0...HEAD\n",
+        "[1.0.0]: https://example.com/releases/v1.0.0\n",
+    ]
+    unreleased = changelog.sections[changelog.section_index("Unreleased")]
+    assert list(unreleased.categories) == ["Added", "Fixed"]
+    assert "### Fixed\n" in unreleased.categories["Fixed"][1:]
+
+def test_add_entry_to_existing_category_goes_first():
+    changelog = parse_changelog(SAMPLE)
+    assert changelog.add_entry("Added", "Newest")
+    assert changelog.sections[0].categories["Added"][:3] == ["### Added\n", "- Newest\n", "- New thing\n"]
+
+def test_add_entry_creates_category_ahead_of_existing():
+    changelog = parse_changelog(SAMPLE)
+    assert changelog.add_entry("Add", "Prefix of Added")
+    unreleased = changelog.sections[0]
+    assert list(unreleased.categories) == ["Add", "Added", "Fixed"]
+    assert unreleased.categories["Add"] == ["### Add\n", "- Prefix of Added\n", "\n"]
+    # Released sections are untouched
+    assert "- Prefix of Added\n" not in changelog.sections[1].serialize()
+
+def test_add_entry_without_unreleased_section():
+    changelog = parse_changelog("# Changelog\n\n## [1.0.0]\n")
+    assert not changelog.add_entry("Added", "x")
+
+def test_release_newer_version_goes_first():
+    changelog = parse_changelog(SAMPLE)
+    assert changelog.release("1.1.0", "2024-05-06")
+    assert _versions(changelog) == ["Unreleased", "1.1.0", "1.0.0", "not-a-version"]
+    assert changelog.sections[0].serialize() == ["## [Unreleased]\n", "\n"]
+    released = changelog.sections[1]
+    assert released.header == "## [1.1.0] - 2024-05-06\n"
+    assert list(released.categories) == ["Added", "Fixed"]
+
+def test_release_older_version_goes_before_footer():
+    changelog = parse_changelog(SAMPLE)
+    assert changelog.release("0.5.0", "2024-05-06")
+    assert _versions(changelog) == ["Unreleased", "1.0.0", "0.5.0", "not-a-version"]
+    assert changelog.serialize().endswith(
+        "[unreleased]: https://example.com/compare/v1.0.0...HEAD\n"
+        "[1.0.0]: https://example.com/releases/v1.0.0\n"
+    )
+
+def test_release_orders_prereleases():
+    changelog = parse_changelog("## [Unreleased]\n## [1.0.0]\n## [0.9.0]\n")
+    changelog.release("1.0.0-rc.1", "2024-05-06")
+    assert _versions(changelog) == ["Unreleased", "1.0.0", "1.0.0-rc.1", "0.9.0"]
+
+def test_release_without_versions_follows_unreleased():
+    changelog = parse_changelog("# Changelog\n\n## [Unreleased]\n- x\n")
+    assert changelog.release("0.1.0", "2024-05-06")
+    assert changelog.serialize() == "# Changelog\n\n## [Unreleased]\n\n## [0.1.0] - 2024-05-06\n- x\n"
+
+def test_release_without_unreleased_section():
+    assert not parse_changelog("## [1.0.0]\n").release("1.1.0", "2024-05-06")
+
+class _FixedDate(datetime.date):
+    @classmethod
+    def today(cls):
+        return cls(2024, 5, 6)
+
+@pytest.fixture
+def changelog_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(update_changelog, "date", _FixedDate)
+    path = tmp_path / update_changelog.CHANGELOG_FILE
+    path.write_text(SAMPLE, encoding="utf-8")
+    return path
+
+def test_batch_add_matches_sequential_adds(changelog_file):
+    entries = [("Added", "b1"), ("Perf", "b2"), ("Perf", "b3"), ("Fixed", "b4")]
+    assert update_changelog.batch_add_entries(entries)
+    batched = changelog_file.read_text(encoding="utf-8")
+
+    changelog_file.write_text(SAMPLE, encoding="utf-8")
+    for category, description in entries:
+        assert update_changelog.add_changelog_entry(category, description)
+    assert changelog_file.read_text(encoding="utf-8") == batched
+
+def test_create_release_writes_file(changelog_file):
+    assert update_changelog.create_release("0.5.0")
+    text = changelog_file.read_text(encoding="utf-8")
+    assert text.index("## [1.0.0]") < text.index("## [0.5.0] - 2024-05-06") < text.index("[unreleased]: ")
+
+def test_create_release_rejects_invalid_version(changelog_file):
+    assert not update_changelog.create_release("bogus")
+    assert changelog_file.read_text(encoding="utf-8") == SAMPLE
@@ -7,212 +7,270 @@
 import sys
 import os
 import re
-from datetime import datetime
+import tempfile
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+from typing import Optional
 import semver
 
 CHANGELOG_FILE = "CHANGELOG.md"
-UNRELEASED_PATTERN = r"## \[Unreleased\]"
-VERSION_PATTERN = r"## \[(\d+\.\d+\.\d+(-\w+(\.\d+)?)?)\]"
+UNRELEASED_HEADER = "## [Unreleased]"
+
+# Name of a '## [name]' section header, e.g. Unreleased or a version
+SECTION_NAME_RE = re.compile(r"## \[([^\]]+)\]")
+# Markdown link reference definition, e.g. "[1.0.0]: https://..."
+LINK_REFERENCE_RE = re.compile(r"\[[^\]]+\]:\s*\S")
+
+# Last changelog content read or written, keyed by path and (size, mtime) so
+# repeated calls in one process skip re-reading an unchanged file
+_changelog_cache = None
+
+def _changelog_signature():
+    """Return (path, size, mtime_ns) of the changelog file."""
+    stat = os.stat(CHANGELOG_FILE)
+    return os.path.abspath(CHANGELOG_FILE), stat.st_size, stat.st_mtime_ns
 
 def get_changelog_content():
     """Read the current changelog content."""
+    global _changelog_cache
     if not os.path.exists(CHANGELOG_FILE):
         return None
     
+    signature = _changelog_signature()
+    if _changelog_cache is not None and _changelog_cache[0] == signature:
+        return _changelog_cache[1]
+    
     with open(CHANGELOG_FILE, "r", encoding="utf-8") as file:
-        return file.read()
+        content = file.read()
+    _changelog_cache = (signature, content)
+    return content
 
-def add_changelog_entry(category, description):
-    """Add a new entry to the changelog under the specified category."""
-    content = get_changelog_content()
-    if not content:
-        print(f"Error: {CHANGELOG_FILE} not found")
-        return False
+def write_changelog_content(content: str):
+    """
+    Write the changelog content.
     
-    # Find the Unreleased section
-    unreleased_match = re.search(UNRELEASED_PATTERN, content)
-    if not unreleased_match:
-        print(f"Error: Could not find [Unreleased] section in {CHANGELOG_FILE}")
-        return False
+    The content goes to a temporary file next to the changelog, which then
+    replaces it with os.replace, so an interrupted write never leaves a
+    truncated changelog. The written content is cached for the next
+    get_changelog_content call.
+    """
+    global _changelog_cache
+    directory = os.path.dirname(CHANGELOG_FILE) or "."
+    with tempfile.NamedTemporaryFile(
+        mode="w", encoding="utf-8", dir=directory, delete=False
+    ) as file:
+        try:
+            file.write(content)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    
+    try:
+        # Keep the existing file's permissions rather than the temp file's 0600
+        if os.path.exists(CHANGELOG_FILE):
+            os.chmod(file.name, os.stat(CHANGELOG_FILE).st_mode & 0o7777)
+        os.replace(file.name, CHANGELOG_FILE)
+    except OSError:
+        os.remove(file.name)
+        raise
+    _changelog_cache = (_changelog_signature(), content)
+
+@lru_cache(maxsize=None)
+def parse_version(version):
+    """Parse a version string with semver, or return None if it isn't valid semver."""
+    try:
+        return semver.VersionInfo.parse(version)
+    except ValueError:
+        return None
+
+@dataclass
+class ChangelogSection:
+    """A '## ' section: its header line, the lines before its first category, and its categories."""
+    header: str
+    name: Optional[str] = None
+    lines: list = field(default_factory=list)
+    # Category name -> its lines, starting with the '### ' header line
+    categories: dict = field(default_factory=dict)
     
-    # Find the position to insert the new entry
-    pos = unreleased_match.end()
+    def serialize(self):
+        """Return the section's lines in file order."""
+        lines = [self.header, *self.lines]
+        for category_lines in self.categories.values():
+            lines.extend(category_lines)
+        return lines
+
+@dataclass
+class Changelog:
+    """
+    A parsed changelog: the lines before the first section, its '## ' sections
+    in order, and the link reference definitions that end the file.
+    """
+    preamble: list = field(default_factory=list)
+    sections: list = field(default_factory=list)
+    footer: list = field(default_factory=list)
     
-    # Look for the category section
-    category_pattern = f"### {category}"
-    category_match = re.search(category_pattern, content[pos:])
+    def section_index(self, name):
+        """Return the index of the first section called name, or None."""
+        for index, section in enumerate(self.sections):
+            if section.name == name:
+                return index
+        return None
     
-    if category_match:
-        # Category exists, add entry under it
-        entry_pos = pos + category_match.end()
+    def add_entry(self, category, description):
+        """
+        Add an entry at the top of a category in the Unreleased section.
         
-        # Find the next line after the category
-        next_line_pos = content.find("\n", entry_pos)
-        if next_line_pos != -1:
-            entry_pos = next_line_pos + 1
+        A missing category is created ahead of the existing ones. Returns False
+        if there is no Unreleased section.
+        """
+        index = self.section_index("Unreleased")
+        if index is None:
+            return False
+        unreleased = self.sections[index]
         
-        # Add the new entry
-        new_entry = f"- {description}\n"
-        updated_content = content[:entry_pos] + new_entry + content[entry_pos:]
-    else:
-        # Category doesn't exist, create it
-        # Find a good position to insert (after unreleased header)
-        new_section_pos = content.find("\n", pos)
-        if new_section_pos == -1:
-            new_section_pos = pos
+        entry = f"- {description}\n"
+        if category in unreleased.categories:
+            unreleased.categories[category].insert(1, entry)
         else:
-            new_section_pos += 1
+            unreleased.categories = {
+                category: [f"### {category}\n", entry, "\n"],
+                **unreleased.categories
+            }
+        return True
+    
+    def release(self, version, release_date):
+        """
+        Turn the Unreleased section into a release of version dated release_date.
         
-        # Check if there's an existing category
-        next_category = re.search(r"### ", content[new_section_pos:])
-        if next_category:
-            # Insert before the next category
-            new_section_pos = new_section_pos + next_category.start()
+        A fresh Unreleased section takes its place, and the release goes before
+        the first older version after it (headers that aren't valid semver are
+        skipped), or after the last version if none is older. Returns False if
+        there is no Unreleased section.
+        """
+        index = self.section_index("Unreleased")
+        if index is None:
+            return False
+        unreleased = self.sections[index]
+        curr_version = parse_version(version)
+        
+        # Keep whatever followed the Unreleased title on its header line
+        released = ChangelogSection(
+            f"## [{version}] - {release_date}{unreleased.header[len(UNRELEASED_HEADER):]}",
+            version, unreleased.lines, unreleased.categories
+        )
+        self.sections[index] = ChangelogSection(f"{UNRELEASED_HEADER}\n", "Unreleased", ["\n"])
         
-        # Add the new category and entry
-        new_section = f"\n### {category}\n- {description}\n"
-        updated_content = content[:new_section_pos] + new_section + content[new_section_pos:]
+        insert_index = index + 1
+        for offset, section in enumerate(self.sections[index + 1:], index + 1):
+            existing_version = parse_version(section.name) if section.name else None
+            if existing_version is None:
+                continue
+            if curr_version > existing_version:
+                insert_index = offset
+                break
+            insert_index = offset + 1
+        self.sections.insert(insert_index, released)
+        return True
     
-    # Write back to the file
-    with open(CHANGELOG_FILE, "w", encoding="utf-8") as file:
-        file.write(updated_content)
+    def serialize(self):
+        """Return the changelog as text."""
+        lines = list(self.preamble)
+        for section in self.sections:
+            lines.extend(section.serialize())
+        lines.extend(self.footer)
+        return "".join(lines)
+
+def parse_changelog(text):
+    """
+    Parse changelog text into a Changelog in one pass over its lines.
     
-    print(f"Added '{description}' to '{category}' in {CHANGELOG_FILE}")
-    return True
+    Serializing the result gives back the same text, except that a missing
+    final newline is added.
+    """
+    if text and not text.endswith("\n"):
+        text += "\n"
+    
+    lines = text.splitlines(keepends=True)
+    
+    # Link references at the end of the file ("[1.0.0]: https://...") form a
+    # footer that stays last wherever sections are inserted
+    footer_start = len(lines)
+    for index in range(len(lines) - 1, -1, -1):
+        if LINK_REFERENCE_RE.match(lines[index]):
+            footer_start = index
+        elif lines[index].strip():
+            break
+    
+    changelog = Changelog(footer=lines[footer_start:])
+    target = changelog.preamble
+    section = None
+    for line in lines[:footer_start]:
+        if line.startswith("## "):
+            match = SECTION_NAME_RE.match(line)
+            section = ChangelogSection(line, match.group(1) if match else None)
+            changelog.sections.append(section)
+            target = section.lines
+            continue
+        
+        # A repeated category header is kept in place as an ordinary line
+        category = line[4:].strip() if line.startswith("### ") else None
+        if section is not None and category and category not in section.categories:
+            target = section.categories[category] = [line]
+        else:
+            target.append(line)
+    return changelog
 
-def create_release(version):
-    """Convert Unreleased section to a release with version number and date, ensuring proper version ordering."""
+def add_changelog_entry(category, description):
+    """Add a new entry to the changelog under the specified category."""
+    return batch_add_entries([(category, description)])
+
+def batch_add_entries(entries):
+    """
+    Add several (category, description) entries with one parse and one write.
+    
+    Entries are applied in order to the parsed changelog, so later ones see the
+    categories earlier ones created. Nothing is written if any entry can't be added.
+    """
     content = get_changelog_content()
     if not content:
         print(f"Error: {CHANGELOG_FILE} not found")
         return False
     
-    # Find the Unreleased section
-    unreleased_match = re.search(UNRELEASED_PATTERN, content)
-    if not unreleased_match:
-        print(f"Error: Could not find [Unreleased] section in {CHANGELOG_FILE}")
-        return False
+    changelog = parse_changelog(content)
+    for category, description in entries:
+        if not changelog.add_entry(category, description):
+            print(f"Error: Could not find [Unreleased] section in {CHANGELOG_FILE}")
+            return False
     
-    # Get today's date
-    today = datetime.now().strftime("%Y-%m-%d")
+    write_changelog_content(changelog.serialize())
     
-    # Extract the content from the Unreleased section
-    unreleased_content_start = unreleased_match.end()
-    
-    # Find where the next version header starts, if any
-    next_version_match = re.search(VERSION_PATTERN, content[unreleased_content_start:])
-    
-    if next_version_match:
-        unreleased_content_end = unreleased_content_start + next_version_match.start()
-    else:
-        unreleased_content_end = len(content)
-    
-    unreleased_content = content[unreleased_content_start:unreleased_content_end]
-    
-    # Remove the original unreleased section
-    content_without_unreleased = content[:unreleased_match.start()] + content[unreleased_content_end:]
+    for category, description in entries:
+        print(f"Added '{description}' to '{category}' in {CHANGELOG_FILE}")
+    return True
+
+def create_release(version):
+    """Convert Unreleased section to a release with version number and date, ensuring proper version ordering."""
+    # Validate the version before doing any work
+    if parse_version(version) is None:
+        print(f"Error: '{version}' is not a valid semantic version (e.g. 1.2.0)")
+        return False
     
-    # Create the new version section
-    new_version_section = f"## [{version}] - {today}{unreleased_content}"
+    content = get_changelog_content()
+    if not content:
+        print(f"Error: {CHANGELOG_FILE} not found")
+        return False
     
-    # Find all existing versions to determine where to insert the new version
-    existing_versions = re.findall(VERSION_PATTERN, content_without_unreleased)
+    # Get today's date (isoformat is already YYYY-MM-DD, no strftime needed)
+    today = date.today().isoformat()
     
-    # If there are existing versions, find the right place to insert the new version
-    if existing_versions:
-        # Try to parse the current version with semver
-        try:
-            curr_version = version
-            # Normalize versions to standard semver if needed
-            if not curr_version.startswith('v'):
-                curr_version = curr_version
-                
-            # Find the correct position to insert the new version
-            position_found = False
-            
-            for match in re.finditer(VERSION_PATTERN, content_without_unreleased):
-                existing_ver = match.group(1)
-                
-                # Check if the existing version is older than the current version
-                try:
-                    if semver.compare(curr_version, existing_ver) > 0:
-                        # Current version is newer, insert before this position
-                        position = match.start()
-                        content_without_unreleased = (
-                            content_without_unreleased[:position] + 
-                            new_version_section + 
-                            content_without_unreleased[position:]
-                        )
-                        position_found = True
-                        break
-                except:
-                    # If semver comparison fails, try simple string comparison
-                    if curr_version > existing_ver:
-                        position = match.start()
-                        content_without_unreleased = (
-                            content_without_unreleased[:position] + 
-                            new_version_section + 
-                            content_without_unreleased[position:]
-                        )
-                        position_found = True
-                        break
-                    
-            # If no position found, add to the end
-            if not position_found:
-                # Find the earliest position after the title/header
-                first_header_pos = content_without_unreleased.find('#')
-                if first_header_pos >= 0:
-                    title_end_pos = content_without_unreleased.find('\n', first_header_pos)
-                    if title_end_pos >= 0:
-                        content_without_unreleased = (
-                            content_without_unreleased[:title_end_pos+1] + 
-                            new_version_section + 
-                            content_without_unreleased[title_end_pos+1:]
-                        )
-                    else:
-                        content_without_unreleased += new_version_section
-                else:
-                    content_without_unreleased += new_version_section
-                        
-        except Exception as e:
-            # If there's any error with semver, just add after the unreleased section
-            print(f"Warning: Error parsing versions: {e}")
-            content_without_unreleased = (
-                content_without_unreleased[:unreleased_match.start()] + 
-                new_version_section + 
-                content_without_unreleased[unreleased_match.start():]
-            )
-    else:
-        # No existing versions, add after the title
-        first_header_pos = content_without_unreleased.find('#')
-        if first_header_pos >= 0:
-            title_end_pos = content_without_unreleased.find('\n', first_header_pos)
-            if title_end_pos >= 0:
-                content_without_unreleased = (
-                    content_without_unreleased[:title_end_pos+1] + 
-                    new_version_section + 
-                    content_without_unreleased[title_end_pos+1:]
-                )
-            else:
-                content_without_unreleased += new_version_section
-        else:
-            content_without_unreleased += new_version_section
-    
-    # Add a new Unreleased section at the top
-    new_unreleased = f"## [Unreleased]\n\n"
-    first_header_pos = content_without_unreleased.find('#')
-    if first_header_pos >= 0:
-        content_with_unreleased = (
-            content_without_unreleased[:first_header_pos] + 
-            new_unreleased + 
-            content_without_unreleased[first_header_pos:]
-        )
-    else:
-        content_with_unreleased = new_unreleased + content_without_unreleased
+    changelog = parse_changelog(content)
+    if not changelog.release(version, today):
+        print(f"Error: Could not find [Unreleased] section in {CHANGELOG_FILE}")
+        return False
     
-    # Write back to the file
-    with open(CHANGELOG_FILE, "w", encoding="utf-8") as file:
-        file.write(content_with_unreleased)
+    write_changelog_content(changelog.serialize())
     
     print(f"Created release version {version} dated {today} in {CHANGELOG_FILE}")
     return True